@@ -0,0 +1,96 @@
+"""
+Solves files of scrambles in parallel
+
+Each line of the input is a scramble (e.g. "R U R' U'"), and the matching line
+of the output is its solution. Scrambles are spread over a pool of worker
+processes, which all memory map the same solver tables, and the results are
+written in order while only a bounded number of scrambles are in flight.
+"""
+import argparse
+import multiprocessing
+import sys
+
+import solver
+from cube import Cube, CubeMove, moves_to_string
+from parallel import ordered_imap
+
+# Options given to solver.solve in each worker
+_solve_options = {}
+
+
+def _init_worker(options):
+    """ Loads the (memory mapped) solver tables once in each worker """
+    _solve_options.update(options)
+    solver.get_tables(options.get("cache_dir"))
+
+
+def solve_scramble(scramble, **options):
+    """
+    Solves a single scramble string
+    Returns the solution string, or an error message starting with "error:".
+    """
+    try:
+        cube = Cube()
+        for move_string in scramble.split():
+            cube.make_move(CubeMove.parse(move_string))
+        return moves_to_string(solver.solve(cube, **options))
+    except ValueError as err:
+        return "error: {}".format(err)
+
+
+def _solve_in_worker(scramble):
+    """ Solves a scramble with the worker's options """
+    return solve_scramble(scramble, **_solve_options)
+
+
+def solve_scrambles(scrambles, workers=None, max_pending=None, **options):
+    """
+    Solves an iterable of scramble strings over a process pool, yielding the
+    solutions in the same order
+    At most max_pending scrambles (default 4 per worker) are read ahead, so
+    memory use stays bounded however long the input is. Other options are
+    passed on to solver.solve.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    max_pending = max_pending or 4 * workers
+    # build any missing tables once, before the workers start mapping them
+    solver.get_tables(options.get("cache_dir"))
+    return ordered_imap(_solve_in_worker, scrambles, workers, max_pending,
+                        _init_worker, (options, ))
+
+
+def main():
+    """ Entry point """
+    parser = argparse.ArgumentParser(description="Solve a file of scrambles")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="file of scrambles, one per line (default stdin)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file to write solutions to (default stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes (default all cores)")
+    parser.add_argument("--max-length", type=int, default=21,
+                        help="stop at the first solution this short")
+    parser.add_argument("--timeout", type=float, default=1.0,
+                        help="seconds to spend on each scramble")
+    parser.add_argument("--strict", action="store_true",
+                        help="report solutions longer than --max-length as "
+                        "errors")
+    args = parser.parse_args()
+
+    in_file = sys.stdin if args.input == "-" else open(args.input)
+    out_file = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        scrambles = (line.strip() for line in in_file)
+        for solution in solve_scrambles(
+                scrambles, args.workers, max_length=args.max_length,
+                timeout=args.timeout, strict=args.strict):
+            out_file.write(solution + "\n")
+    finally:
+        if in_file is not sys.stdin:
+            in_file.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+
+
+if __name__ == "__main__":
+    main()
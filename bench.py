@@ -0,0 +1,318 @@
+"""
+Benchmarks of the model and rendering hot paths
+
+Each benchmark times a fixed amount of work (the best of several repeats) and
+reports the seconds per operation. Results are written as JSON, and compared
+against a stored baseline (bench_baseline.json) so a change that slows a hot
+path down by more than the threshold fails, e.g.
+    python bench.py --compare bench_baseline.json
+Benchmarks needing modules which are not installed (such as OpenGL for the
+renderer) are reported as skipped. A benchmark measured now but skipped in
+the baseline also fails the comparison, as it has nothing to be checked
+against. Timings depend on the machine, so only compare against a baseline
+made on the same one.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+from cube import MOVES, Cube, CubeMove, moves_to_string, parse_moves
+from cubebatch import CubeBatch, random_move_indices
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+# Fraction a benchmark may slow down by before it counts as a regression
+THRESHOLD = 0.25
+REPEATS = 5
+
+# name -> function making the benchmark, see benchmark()
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registers a benchmark
+    The decorated function does any setup and returns a (run, ops) pair, where
+    run() does ops operations. It may raise an ImportError to be skipped.
+    """
+
+    def register(make):
+        BENCHMARKS[name] = make
+        return make
+
+    return register
+
+
+def _random_moves(n, seed=0):
+    """ Makes a list of n random face turns """
+    rng = random.Random(seed)
+    return [rng.choice(MOVES[:18]) for _ in range(n)]
+
+
+@benchmark("cube.make_move")
+def _make_move():
+    cube = Cube()
+    moves = _random_moves(10000)
+
+    def run():
+        for move in moves:
+            cube.make_move(move)
+
+    return run, len(moves)
+
+
+@benchmark("cubebatch.apply_move_indices")
+def _batch_move():
+    batch = CubeBatch.solved(1000)
+    indices = random_move_indices(len(batch), 20, np.random.default_rng(0))
+
+    def run():
+        for step in range(indices.shape[1]):
+            batch.apply_move_indices(indices[:, step])
+
+    return run, indices.size
+
+
+@benchmark("cube.CubeMove.parse")
+def _parse_move():
+    tokens = moves_to_string(_random_moves(10000)).split()
+
+    def run():
+        for token in tokens:
+            CubeMove.parse(token)
+
+    return run, len(tokens)
+
+
+@benchmark("cube.parse_moves")
+def _parse_moves():
+    move_string = moves_to_string(_random_moves(10000))
+
+    def run():
+        parse_moves(move_string)
+
+    return run, len(move_string.split())
+
+
+@benchmark("render.parse_all_moves")
+def _parse_all_moves():
+    import render
+    move_string = moves_to_string(_random_moves(10000))
+
+    def run():
+        render.parse_all_moves(move_string)
+
+    return run, len(move_string.split())
+
+
+def _renderer_benchmark(method):
+    """ Benchmarks a CubeRenderer method, one call per operation """
+    from cuberender import CubeRenderer
+    renderer = CubeRenderer(Cube())
+
+    def run():
+        for _ in range(10):
+            getattr(renderer, method)()
+
+    return run, 10
+
+
+@benchmark("cuberender.get_squares")
+def _get_squares():
+    return _renderer_benchmark("get_squares")
+
+
+@benchmark("cuberender.get_colors")
+def _get_colors():
+    return _renderer_benchmark("get_colors")
+
+
+@benchmark("cuberender.get_normals")
+def _get_normals():
+    return _renderer_benchmark("get_normals")
+
+
+@benchmark("cuberender.frame")
+def _frame():
+    # what render.render_frame asks the renderer for each frame
+    from cuberender import CubeRenderer
+    cube = Cube()
+
+    def run():
+        for _ in range(10):
+            renderer = CubeRenderer(cube)
+            renderer.get_squares()
+            renderer.get_colors()
+            renderer.get_normals()
+
+    return run, 10
+
+
+@benchmark("cuberender.square_vertices.build")
+def _build_square_vertices():
+    # the geometry is cached after the first call, so time building it anew
+    from cuberender import square_vertices
+
+    def run():
+        for _ in range(10):
+            square_vertices.__wrapped__()
+
+    return run, 10
+
+
+@benchmark("lab_utils.make_translation")
+def _make_translation():
+    import lab_utils as lu
+
+    def run():
+        for i in range(1000):
+            lu.make_translation(i, 0.5, -i)
+
+    return run, 1000
+
+
+@benchmark("lab_utils.Mat4.__mul__")
+def _matrix_multiply():
+    import lab_utils as lu
+    first = lu.make_rotation_x(0.5)
+    second = lu.make_translation(1, 2, 3)
+
+    def run():
+        for _ in range(1000):
+            first * second  # pylint: disable=pointless-statement
+
+    return run, 1000
+
+
+@benchmark("lab_utils.transformPoint")
+def _transform_point():
+    import lab_utils as lu
+    transform = lu.make_translation(1, 2, 3) * lu.make_rotation_y(0.5)
+
+    def run():
+        for i in range(1000):
+            lu.transformPoint(transform, [i, 0.5, -i])
+
+    return run, 1000
+
+
+def time_benchmark(make, repeats=REPEATS):
+    """ Gets the best seconds per operation of a benchmark over repeats runs """
+    run, ops = make()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best / ops
+
+
+def run_benchmarks(names=None, repeats=REPEATS):
+    """
+    Runs the named benchmarks (default all), returning the results as a dict
+    with each one's seconds per operation, or the reason it was skipped
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        try:
+            seconds = time_benchmark(BENCHMARKS[name], repeats)
+        except ImportError as err:
+            results[name] = {"skipped": str(err)}
+            continue
+        results[name] = {
+            "seconds_per_op": seconds,
+            "ops_per_second": 1 / seconds
+        }
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": results
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Compares results against a baseline, returning a (name, ratio) pair for
+    each benchmark more than threshold slower (ratio being new / old time)
+    Benchmarks which were skipped in either are ignored.
+    """
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        old = baseline["benchmarks"].get(name, {})
+        if "seconds_per_op" not in result or "seconds_per_op" not in old:
+            continue
+        ratio = result["seconds_per_op"] / old["seconds_per_op"]
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def unmeasured(results, baseline):
+    """
+    Gets the names of the benchmarks which were measured in results, but
+    skipped in (or missing from) the baseline, so compare() cannot check them
+    """
+    return [name for name, result in results["benchmarks"].items()
+            if "seconds_per_op" in result and
+            "seconds_per_op" not in baseline["benchmarks"].get(name, {})]
+
+
+def main():
+    """ Entry point """
+    parser = argparse.ArgumentParser(description="Run the benchmarks")
+    parser.add_argument("names", nargs="*",
+                        help="benchmarks to run (default all)")
+    parser.add_argument("-o", "--output",
+                        help="file to write the JSON results to")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_PATH,
+                        help="baseline to compare against (default {})".format(
+                            os.path.basename(BASELINE_PATH)))
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slow down before failing (default {})".
+                        format(THRESHOLD))
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help="runs of each benchmark, the best is kept")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error("Unknown benchmarks: {}".format(", ".join(unknown)))
+    results = run_benchmarks(args.names, args.repeats)
+    for name, result in results["benchmarks"].items():
+        if "skipped" in result:
+            print("{:32} skipped ({})".format(name, result["skipped"]))
+        else:
+            print("{:32} {:12.3f} us/op {:14.0f} ops/s".format(
+                name, result["seconds_per_op"] * 1e6,
+                result["ops_per_second"]))
+    if args.output:
+        with open(args.output, "w") as out_file:
+            json.dump(results, out_file, indent=2, sort_keys=True)
+            out_file.write("\n")
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print("REGRESSION {}: {:.2f}x slower than the baseline".format(
+                name, ratio))
+        missing = unmeasured(results, baseline)
+        for name in missing:
+            print("UNCHECKED {}: measured, but the baseline has no timing for "
+                  "it ({})".format(name, baseline["benchmarks"].get(
+                      name, {}).get("skipped", "not recorded")))
+        if missing:
+            print("Regenerate the baseline with: python bench.py -o {}".format(
+                args.compare))
+        if regressions or missing:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+N x N x N cubes (from 2x2x2 up to around 20x20x20)
+
+The stickers are held in a flat NumPy array in the same layout as
+cube.Cube.facelets (faces in the order of cube.FACES, each read row by row),
+so a 3x3x3 converts directly to and from a Cube. Each layer turn moves only
+the stickers it touches, with one fancy indexing assignment from a table of
+(destination, source) indices, so turning an inner slice costs O(N) rather
+than a Python loop over every sticker.
+
+Moves use the usual big cube notation: R (outer layer), 3R (the third layer
+only), Rw or r (two layers), 3Rw (three layers), M, E and S (the middle slice,
+on odd sizes) and x, y and z, each followed by an optional count and prime.
+"""
+import re
+
+import numpy as np
+
+from cube import (CORNER_FACELETS, FACE_LETTERS, FACES, PRIME_MARKS,
+                  SOLVED_COLORS, Cube)
+
+MIN_SIZE = 2
+
+# Position of each corner (URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB) as the sign
+# of its x (towards R), y (towards U) and z (towards F) coordinates
+_CORNER_SIGNS = ((1, 1, 1), (-1, 1, 1), (-1, 1, -1), (1, 1, -1), (1, -1, 1),
+                 (-1, -1, 1), (-1, -1, -1), (1, -1, -1))
+
+
+def _face_axes():
+    """
+    Gets the (6, 3, 3) array of each face's outward normal, and the directions
+    its columns and rows run in, worked out from where cube.CORNER_FACELETS
+    puts the corners so the sticker order matches cube.Cube
+    """
+    corner_at = {}
+    for signs, facelets in zip(_CORNER_SIGNS, CORNER_FACELETS):
+        for facelet in facelets:
+            corner_at[facelet] = np.array(signs)
+    axes = []
+    for face in range(len(FACES)):
+        first, last_column, last_row = (corner_at[9 * face + i]
+                                        for i in (0, 2, 6))
+        column = (last_column - first) // 2
+        row = (last_row - first) // 2
+        normal = first * (1 - np.abs(column) - np.abs(row))
+        axes.append((normal, column, row))
+    return np.array(axes)
+
+
+FACE_AXES = _face_axes()
+
+
+def sticker_positions(size):
+    """
+    Gets the (6 * size^2, 3) array of sticker centres and the matching array
+    of outward normals, with the cube spanning -size to size on each axis
+    """
+    offsets = 2 * np.arange(size) - (size - 1)
+    normals, columns, rows = (FACE_AXES[:, i, None, None, :] for i in range(3))
+    positions = (normals * size + columns * offsets[None, None, :, None] +
+                 rows * offsets[None, :, None, None])
+    normals = np.broadcast_to(normals, positions.shape)
+    return positions.reshape(-1, 3), normals.reshape(-1, 3)
+
+
+def _layer_turn(size, face, layer):
+    """
+    Gets the (destination, source) index arrays for a clockwise quarter turn
+    of one layer (0 being the outer one) as seen from a face
+    """
+    positions, normals = sticker_positions(size)
+    axis = FACE_AXES[face, 0]
+    # layer of each sticker counted from the face (stickers on the face
+    # itself are in layer 0, and those on the opposite face in the last)
+    depth = np.clip((size - 1 - positions @ axis) // 2, 0, size - 1)
+    moving = np.flatnonzero(depth == layer)
+
+    # a clockwise quarter turn about the outward axis: v -> a(a.v) - a x v
+    def rotate(vectors):
+        return np.outer(vectors @ axis, axis) - np.cross(axis, vectors)
+
+    index_of = {
+        tuple(position) + tuple(normal): i
+        for i, (position, normal) in enumerate(zip(positions, normals))
+    }
+    moved = zip(rotate(positions[moving]), rotate(normals[moving]))
+    destinations = [
+        index_of[tuple(position) + tuple(normal)] for position, normal in moved
+    ]
+    return np.array(destinations, dtype=np.intp), moving
+
+
+class LayerMove:
+    """
+    A turn of the layers start to stop - 1 (counted from the face, 0 being the
+    outer layer) of a face, or of every layer when stop is None (a whole cube
+    rotation)
+    """
+
+    def __init__(self, face, start=0, stop=1, turns=1):
+        self.face = face
+        self.start = start
+        self.stop = stop
+        self.turns = turns
+
+    def __eq__(self, other):
+        return (isinstance(other, LayerMove)
+                and (self.face, self.start, self.stop, self.turns % 4) ==
+                (other.face, other.start, other.stop, other.turns % 4))
+
+    def __repr__(self):
+        return "LayerMove({!r}, {}, {}, {})".format(self.face, self.start,
+                                                    self.stop, self.turns)
+
+
+_ROTATION_FACES = {"x": "R", "y": "U", "z": "F"}
+_SLICE_FACES = {"M": "L", "E": "D", "S": "F"}
+_BIG_MOVE_RE = re.compile(
+    r"(?:(?P<depth>[0-9]*)(?P<face>[URFDLB])(?P<wide>w?)|(?P<lower>[urfdlb])"
+    r"|(?P<slice>[MES])|(?P<rotation>[xyz]))"
+    r"(?P<count>[0-9]*)(?P<prime>[{}]?)".format(PRIME_MARKS))
+
+
+def parse_big_move(move_string, size):
+    """
+    Parses a move in big cube notation (see the module docstring) for a cube
+    of the given size into a LayerMove
+    """
+    match = _BIG_MOVE_RE.fullmatch(move_string)
+    if not match:
+        raise ValueError("Invalid move '{}'.".format(move_string))
+    turns = int(match.group("count") or 1)
+    if match.group("prime"):
+        turns = -turns
+    turns %= 4
+    if match.group("rotation"):
+        return LayerMove(_ROTATION_FACES[match.group("rotation")], 0, None,
+                         turns)
+    if match.group("slice"):
+        if size % 2 == 0:
+            raise ValueError("{} has no middle slice on an even cube".format(
+                move_string))
+        middle = size // 2
+        return LayerMove(_SLICE_FACES[match.group("slice")], middle,
+                         middle + 1, turns)
+    if match.group("lower"):
+        return LayerMove(match.group("lower").upper(), 0, 2, turns)
+    depth = int(match.group("depth") or 0)
+    if match.group("depth") and not 1 <= depth <= size:
+        raise ValueError("{} turns layer {} of a cube with {}".format(
+            move_string, depth, size))
+    if match.group("wide"):
+        return LayerMove(match.group("face"), 0, depth or 2, turns)
+    layer = max(depth - 1, 0)
+    return LayerMove(match.group("face"), layer, layer + 1, turns)
+
+
+def parse_big_moves(move_string, size):
+    """ Parses a whitespace separated string of moves into LayerMoves """
+    return [parse_big_move(part, size) for part in move_string.split()]
+
+
+class BigCube:
+    """
+    An N x N x N cube, with its stickers held as an array of SquareColor
+    values (see the module docstring)
+    """
+
+    # (size, face, layer, turns) -> (destinations, sources), shared by cubes
+    _turn_tables = {}
+
+    def __init__(self, size=3):
+        if size < MIN_SIZE:
+            raise ValueError("A cube must be at least {0}x{0}x{0}".format(
+                MIN_SIZE))
+        self.size = size
+        self.stickers = np.repeat(
+            np.array([color.value for color in SOLVED_COLORS], dtype=np.uint8),
+            size * size)
+
+    @property
+    def faces(self):
+        """ A (6, size, size) view of the stickers, one grid per face """
+        return self.stickers.reshape(len(FACES), self.size, self.size)
+
+    @property
+    def color_values(self):
+        """ The bytes of the sticker colour values (as Cube.color_values) """
+        return self.stickers.tobytes()
+
+    def copy(self):
+        """ Creates a copy of the cube """
+        cube = BigCube(self.size)
+        cube.stickers = self.stickers.copy()
+        return cube
+
+    def __eq__(self, other):
+        return (isinstance(other, BigCube) and self.size == other.size
+                and np.array_equal(self.stickers, other.stickers))
+
+    @classmethod
+    def from_cube(cls, cube):
+        """ Creates a 3x3x3 BigCube in the state of a Cube """
+        big_cube = cls(3)
+        big_cube.stickers = np.frombuffer(cube.color_values,
+                                          dtype=np.uint8).copy()
+        return big_cube
+
+    def to_cube(self):
+        """ Creates a Cube in the state of a 3x3x3 BigCube """
+        if self.size != 3:
+            raise ValueError("Only a 3x3x3 can be converted to a Cube")
+        cube = Cube()
+        cube.color_values = self.stickers.tobytes()
+        return cube
+
+    def _table(self, face, layer, turns):
+        """ Gets the (destinations, sources) indices of a layer turn """
+        key = (self.size, face, layer, turns)
+        table = self._turn_tables.get(key)
+        if table is None:
+            if turns == 1:
+                table = _layer_turn(self.size, face, layer)
+            else:
+                # chain the quarter turn onto the turn one less
+                quarter_destinations, quarter_sources = self._table(
+                    face, layer, 1)
+                destinations, sources = self._table(face, layer, turns - 1)
+                source_of = dict(zip(destinations, sources))
+                sources = [
+                    source_of.get(source, source) for source in quarter_sources
+                ]
+                table = (quarter_destinations, np.array(sources, np.intp))
+            self._turn_tables[key] = table
+        return table
+
+    def turn(self, face, start=0, stop=1, turns=1):
+        """
+        Turns layers start to stop - 1 of a face (0 being the outer layer)
+        clockwise by the given number of quarter turns
+        """
+        face_index = FACE_LETTERS.index(face)
+        turns %= 4
+        if not turns:
+            return
+        stop = self.size if stop is None else stop
+        if not 0 <= start < stop <= self.size:
+            raise ValueError("Layers {} to {} are not in a cube of size {}".
+                             format(start, stop - 1, self.size))
+        for layer in range(start, stop):
+            destinations, sources = self._table(face_index, layer, turns)
+            self.stickers[destinations] = self.stickers[sources]
+
+    def make_move(self, move):
+        """ Makes a LayerMove """
+        self.turn(move.face, move.start, move.stop, move.turns)
+
+    def make_moves(self, moves):
+        """ Makes a sequence of LayerMoves, or the moves in a string """
+        if isinstance(moves, str):
+            moves = parse_big_moves(moves, self.size)
+        for move in moves:
+            self.make_move(move)
+
+    def is_solved(self):
+        """ Whether every face is one colour """
+        faces = self.stickers.reshape(len(FACES), -1)
+        return bool((faces == faces[:, :1]).all())
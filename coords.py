@@ -0,0 +1,271 @@
+"""
+Coordinates of the cubie cube and their move tables
+
+The move tables are generated once and saved as .npy files in the cache
+directory, then memory mapped read-only, so every process on a machine shares
+the same pages instead of building its own copy.
+"""
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from cube import CUBIE_MOVES, FACE_TURNS, MOVES, CubeTurn, CubieCube
+
+CACHE_DIR = os.environ.get(
+    "CUBE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache"))
+
+# The 18 face turns (indices into MOVES) that the move tables cover
+FACE_MOVES = tuple(
+    i for i, move in enumerate(MOVES) if move.turn in FACE_TURNS)
+# Indices (into FACE_MOVES) of the moves which keep the cube in phase 2 of the
+# two-phase algorithm: U, D and half turns of R, L, F, B
+PHASE2_MOVES = tuple(
+    i for i, move_i in enumerate(FACE_MOVES)
+    if MOVES[move_i].turn in (CubeTurn.U, CubeTurn.D)
+    or MOVES[move_i].turns == 2)
+
+# The edges of the UD slice (FR, FL, BL, BR)
+SLICE_EDGES = (8, 9, 10, 11)
+
+
+def _choose(n, k):
+    """ Binomial coefficient (0 when k > n) """
+    if k > n:
+        return 0
+    return math.factorial(n) // (math.factorial(k) * math.factorial(n - k))
+
+
+# Number of values each coordinate can take
+N_TWIST = 3**7
+N_FLIP = 2**11
+N_SLICE = _choose(12, 4)
+N_SLICE_SORTED = N_SLICE * 24
+N_CORNERS = math.factorial(8)
+N_UD_EDGES = math.factorial(8)
+
+
+def _rank_permutation(perm):
+    """ Ranks a permutation of 0..n-1 (lexicographic order) """
+    rank = 0
+    items = sorted(perm)
+    for value in perm:
+        index = items.index(value)
+        rank = rank * len(items) + index
+        items.pop(index)
+    return rank
+
+
+def _unrank_permutation(rank, items):
+    """ Gets the permutation of items with the given lexicographic rank """
+    items = list(items)
+    perm = []
+    for i in range(len(items), 0, -1):
+        factorial = math.factorial(i - 1)
+        index, rank = divmod(rank, factorial)
+        perm.append(items.pop(index))
+    return perm
+
+
+def get_twist(cubie):
+    """ Corner orientation coordinate (0 <= twist < 3^7) """
+    twist = 0
+    for value in cubie.co[:7]:
+        twist = 3 * twist + value
+    return twist
+
+
+def set_twist(cubie, twist):
+    """ Sets the corner orientations from the twist coordinate """
+    total = 0
+    for i in range(6, -1, -1):
+        twist, cubie.co[i] = divmod(twist, 3)
+        total += cubie.co[i]
+    cubie.co[7] = -total % 3
+
+
+def get_flip(cubie):
+    """ Edge orientation coordinate (0 <= flip < 2^11) """
+    flip = 0
+    for value in cubie.eo[:11]:
+        flip = 2 * flip + value
+    return flip
+
+
+def set_flip(cubie, flip):
+    """ Sets the edge orientations from the flip coordinate """
+    total = 0
+    for i in range(10, -1, -1):
+        flip, cubie.eo[i] = divmod(flip, 2)
+        total += cubie.eo[i]
+    cubie.eo[11] = total % 2
+
+
+def get_slice_sorted(cubie):
+    """
+    Position and order of the 4 UD slice edges (0 <= slice_sorted < 11880)
+    slice_sorted // 24 is the position coordinate (0 when they are in the
+    slice), and slice_sorted % 24 their order.
+    """
+    positions = [i for i, edge in enumerate(cubie.ep) if edge in SLICE_EDGES]
+    order = [cubie.ep[i] for i in positions]
+    return _slice_position(positions) * 24 + _rank_permutation(order)
+
+
+def _slice_position(positions):
+    """
+    Ranks the set of 4 edge positions holding the slice edges, so the slice
+    positions (8, 9, 10, 11) rank as 0
+    """
+    rank = 0
+    remaining = 4
+    for i in range(11, -1, -1):
+        if i in positions:
+            remaining -= 1
+        elif remaining:
+            rank += _choose(i, remaining - 1)
+    return rank
+
+
+def _slice_positions(rank):
+    """ Gets the 4 edge positions for a slice position rank """
+    positions = []
+    remaining = 4
+    for i in range(11, -1, -1):
+        if remaining and rank < _choose(i, remaining - 1):
+            positions.append(i)
+            remaining -= 1
+        elif remaining:
+            rank -= _choose(i, remaining - 1)
+    return sorted(positions)
+
+
+def set_slice_sorted(cubie, slice_sorted):
+    """
+    Places the UD slice edges from the slice_sorted coordinate
+    The other edges are filled into the remaining positions in order.
+    """
+    rank, order = divmod(slice_sorted, 24)
+    positions = _slice_positions(rank)
+    edges = _unrank_permutation(order, SLICE_EDGES)
+    others = iter(edge for edge in range(12) if edge not in SLICE_EDGES)
+    cubie.ep = [
+        edges[positions.index(i)] if i in positions else next(others)
+        for i in range(12)
+    ]
+
+
+def get_corners(cubie):
+    """ Corner permutation coordinate (0 <= corners < 8!) """
+    return _rank_permutation(cubie.cp)
+
+
+def set_corners(cubie, corners):
+    """ Sets the corner permutation from its coordinate """
+    cubie.cp = _unrank_permutation(corners, range(8))
+
+
+def get_ud_edges(cubie):
+    """
+    Permutation of the 8 U and D layer edges (0 <= ud_edges < 8!)
+    Only meaningful in phase 2, where these edges are all in the U and D layers.
+    """
+    return _rank_permutation(cubie.ep[:8])
+
+
+def set_ud_edges(cubie, ud_edges):
+    """ Sets the U and D layer edges (with the slice edges in the slice) """
+    cubie.ep = _unrank_permutation(ud_edges, range(8)) + list(SLICE_EDGES)
+
+
+def _make_table(size, setter, getter, moves):
+    """
+    Makes a move table for a coordinate, where table[coord, i] is the new
+    coordinate after making FACE_MOVES[i] (or -1 if i is not in moves)
+    """
+    table = np.full((size, len(FACE_MOVES)), -1, dtype=np.int32)
+    for coord in range(size):
+        cubie = CubieCube()
+        setter(cubie, coord)
+        for i in moves:
+            moved = cubie.copy()
+            moved.multiply(CUBIE_MOVES[FACE_MOVES[i]])
+            table[coord, i] = getter(moved)
+    return table
+
+
+ALL_FACE_MOVES = tuple(range(len(FACE_MOVES)))
+
+# name -> (size, setter, getter, moves covered) of each coordinate's move table
+# (the U and D layer edges are only tracked in phase 2)
+TABLE_SPECS = {
+    "twist": (N_TWIST, set_twist, get_twist, ALL_FACE_MOVES),
+    "flip": (N_FLIP, set_flip, get_flip, ALL_FACE_MOVES),
+    "slice_sorted": (N_SLICE_SORTED, set_slice_sorted, get_slice_sorted,
+                     ALL_FACE_MOVES),
+    "corners": (N_CORNERS, set_corners, get_corners, ALL_FACE_MOVES),
+    "ud_edges": (N_UD_EDGES, set_ud_edges, get_ud_edges, PHASE2_MOVES),
+}
+
+
+def table_path(name, cache_dir=None):
+    """ Gets the path of a cached table """
+    return os.path.join(cache_dir or CACHE_DIR, name + ".npy")
+
+
+def save_table(name, table, cache_dir=None):
+    """
+    Saves a table into the cache directory
+    The file is written under a temporary name and renamed into place, so other
+    processes never see a half written table.
+    """
+    path = table_path(name, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix=".npy.tmp")
+    try:
+        with os.fdopen(handle, "wb") as tmp_file:
+            np.save(tmp_file, table)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_table(name, builder, cache_dir=None):
+    """
+    Loads a table from the cache directory as a read-only memory map, building
+    and saving it first (with builder()) if it is not there yet
+    """
+    path = table_path(name, cache_dir)
+    if not os.path.exists(path):
+        save_table(name, builder(), cache_dir)
+    return np.load(path, mmap_mode="r")
+
+
+_move_tables = {}
+
+
+def move_table(name, cache_dir=None):
+    """
+    Gets the move table for a coordinate (see TABLE_SPECS), indexed by
+    [coordinate, index into FACE_MOVES]
+    """
+    key = (name, cache_dir)
+    if key not in _move_tables:
+        _move_tables[key] = load_table(
+            name + "_move", lambda: _make_table(*TABLE_SPECS[name]), cache_dir)
+    return _move_tables[key]
+
+
+def build_all(cache_dir=None):
+    """ Builds (or loads) every move table """
+    return {name: move_table(name, cache_dir) for name in TABLE_SPECS}
+
+
+if __name__ == "__main__":
+    for table_name, loaded in build_all().items():
+        print("{}: {}".format(table_name, loaded.shape))
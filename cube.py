@@ -1,6 +1,10 @@
 """ Rubik's Cube model module """
 import enum
+import functools
 import os
+import re
+import sys
+from operator import itemgetter
 
 
 class CubeTurn(enum.Enum):
@@ -14,6 +18,47 @@ class CubeTurn(enum.Enum):
     x = 7
     y = 8
     z = 9
+    M = 10
+    E = 11
+    S = 12
+    Rw = 13
+    Lw = 14
+    Fw = 15
+    Bw = 16
+    Uw = 17
+    Dw = 18
+
+
+# Turns of a single outer face, and whole cube rotations
+FACE_TURNS = (CubeTurn.R, CubeTurn.L, CubeTurn.F, CubeTurn.B, CubeTurn.U,
+              CubeTurn.D)
+ROTATION_TURNS = (CubeTurn.x, CubeTurn.y, CubeTurn.z)
+# Slice and wide turns, made up of face turns and rotations
+COMPOSITE_TURNS = {
+    CubeTurn.M: "R L' x'",
+    CubeTurn.E: "U D' y'",
+    CubeTurn.S: "F' B z",
+    CubeTurn.Rw: "L x",
+    CubeTurn.Lw: "R x'",
+    CubeTurn.Fw: "B z",
+    CubeTurn.Bw: "F z'",
+    CubeTurn.Uw: "D y",
+    CubeTurn.Dw: "U y'",
+}
+
+# Notation for each turn, including the lower case form of wide turns
+TURN_NAMES = {turn.name: turn for turn in CubeTurn}
+TURN_NAMES.update({
+    turn.name[0].lower(): turn
+    for turn in COMPOSITE_TURNS if turn.name.endswith("w")
+})
+PRIME_MARKS = "'\u2019"
+# A move: the turn, then an optional repeat count and prime (e.g. R, Rw2, r2')
+_MOVE_PATTERN = "(?P<turn>{})(?P<count>[0-9]*)(?P<prime>[{}]?)".format(
+    "|".join(sorted(TURN_NAMES, key=len, reverse=True)), PRIME_MARKS)
+_MOVE_RE = re.compile(_MOVE_PATTERN)
+_TOKEN_RE = re.compile(r"(?P<move>{})|(?P<space>\s+)|(?P<bad>\S+)".format(
+    _MOVE_PATTERN.replace("?P<", "?P<_")))
 
 
 class CubeMove:
@@ -26,44 +71,100 @@ class CubeMove:
     @classmethod
     def parse(cls, move_string):
         """ Parses a single string, representing a move """
-        n = 1
-        if len(move_string) == 2:
-            n_char = move_string[1]
-            if n_char == "'":
-                n = 3
-            elif n_char == "2":
-                n = 2
-            else:
-                raise ValueError(
-                    "Invalid move '{}'. Invalid specifier '{}'".format(
-                        move_string, n_char))
-        elif len(move_string) > 2:
-            raise ValueError(
-                "Invalid move '{}'. Move should be at most 2 characters long.".
-                format(move_string))
-        turn_name = move_string[0]
-        if turn_name == "F":
-            turn = CubeTurn.F
-        elif turn_name == "R":
-            turn = CubeTurn.R
-        elif turn_name == "L":
-            turn = CubeTurn.L
-        elif turn_name == "U":
-            turn = CubeTurn.U
-        elif turn_name == "D":
-            turn = CubeTurn.D
-        elif turn_name == "B":
-            turn = CubeTurn.B
-        elif turn_name == "x":
-            turn = CubeTurn.x
-        elif turn_name == "y":
-            turn = CubeTurn.y
-        elif turn_name == "z":
-            turn = CubeTurn.z
-        else:
-            raise ValueError("Invalid move '{}'. Unknown turn '{}'.".format(
-                move_string, turn_name))
-        return cls(turn, n)
+        match = _MOVE_RE.fullmatch(move_string)
+        if not match:
+            raise ValueError("Invalid move '{}'.".format(move_string))
+        return cls(*_move_turns(*match.groups()))
+
+    def inverse(self):
+        """ Gets the move which undoes this one """
+        return CubeMove(self.turn, -self.turns % 4)
+
+    def __str__(self):
+        """ The move in standard notation (e.g. R, R2, R') """
+        return self.turn.name + TURN_SUFFIXES[self.turns % 4]
+
+
+# Notation suffix for the number of clockwise quarter turns in a move
+TURN_SUFFIXES = ("0", "", "2", "'")
+
+
+def _move_turns(turn_name, count, prime):
+    """ Gets the turn and number of quarter turns from the parts of a move """
+    count = int(count or 1)
+    if prime:
+        count = -count
+    return TURN_NAMES[turn_name], count % 4
+
+
+class MoveSyntaxError(ValueError):
+    """
+    Raised for invalid moves in a move string
+    errors holds a (position, text) pair for each invalid part of the string.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("Invalid move{} {}".format(
+            "s" if len(errors) > 1 else "", ", ".join(
+                "'{}' at position {}".format(text, position)
+                for position, text in errors)))
+
+
+def _read_chunks(source, chunk_size):
+    """ Reads a string, or a file-like object in chunks """
+    if isinstance(source, str):
+        yield source
+        return
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_moves(source, errors=None, chunk_size=1 << 16):
+    """
+    Parses moves from a string or a file-like object, yielding CubeMoves as it
+    goes (so large inputs are never held in memory at once)
+    Moves may be separated by any whitespace (or none, e.g. "RUR'U'"). Invalid
+    parts of the input are skipped, with their positions appended to errors if
+    it is given; otherwise a MoveSyntaxError listing them all is raised at the
+    end of the input.
+    """
+    found_errors = [] if errors is None else errors
+    offset = 0
+    pending = ""
+    chunks = _read_chunks(source, chunk_size)
+    while True:
+        chunk = next(chunks, None)
+        buffer = pending + (chunk or "")
+        tokens = list(_TOKEN_RE.finditer(buffer))
+        end = len(buffer)
+        if chunk is not None and tokens:
+            # the last token may continue into the next chunk, so keep it back
+            end = tokens.pop().start()
+        for token in tokens:
+            kind = token.lastgroup
+            if kind == "move":
+                yield CubeMove(*_move_turns(*token.group(
+                    "_turn", "_count", "_prime")))
+            elif kind == "bad":
+                found_errors.append((offset + token.start(), token.group()))
+        pending = buffer[end:]
+        offset += end
+        if chunk is None:
+            break
+    if errors is None and found_errors:
+        raise MoveSyntaxError(found_errors)
+
+
+def parse_moves(move_string):
+    """
+    Parses a string of moves into a list of CubeMoves
+    Raises a MoveSyntaxError (a ValueError) listing every invalid move.
+    """
+    return list(iter_moves(move_string))
 
 
 class SquareColor(enum.Enum):
@@ -144,6 +245,8 @@ def hard_face_rotations(faces, indices_list):
 class Face:
     """ Represents a single face of a Rubik's cube """
 
+    __slots__ = ("squares", )
+
     def __init__(self, squares):
         self.squares = squares
 
@@ -165,6 +268,12 @@ class Face:
         return "{0} {1} {2}{nl}{3} {4} {5}{nl}{6} {7} {8}".format(
             *self.squares, nl=os.linesep)
 
+    def __eq__(self, other):
+        return isinstance(other, Face) and self.squares == other.squares
+
+    def __hash__(self):
+        return hash(tuple(self.squares))
+
     def copy(self):
         """ Creates a copy of the faces object """
         return Face(self.squares.copy())
@@ -190,39 +299,44 @@ class Face:
 #                 6 7 8
 
 
-class Cube:
-    """ The Rubik's cube model """
+# Order of the faces in the flat facelet array (U R F D L B), each face taking
+# up 9 consecutive facelets, indexed as in the diagram above
+FACES = ("top", "right", "front", "bottom", "left", "back")
+SOLVED_COLORS = (SquareColor.YELLOW, SquareColor.GREEN, SquareColor.RED,
+                 SquareColor.WHITE, SquareColor.BLUE, SquareColor.ORANGE)
+FACELET_COUNT = 9 * len(FACES)
+# Letter of each face in facelet strings (e.g. "UUUUUUUUURRRRRRRRRFFF...")
+FACE_LETTERS = "URFDLB"
 
-    def __init__(self):
-        self.top = Face.from_color(SquareColor.YELLOW)
-        self.bottom = Face.from_color(SquareColor.WHITE)
-        self.front = Face.from_color(SquareColor.RED)
-        self.back = Face.from_color(SquareColor.ORANGE)
-        self.left = Face.from_color(SquareColor.BLUE)
-        self.right = Face.from_color(SquareColor.GREEN)
 
-    def make_move(self, move):
-        """ Given a move, make it """
-        turn = move.turn
-        for _ in range(move.turns):
-            if turn == CubeTurn.R:
-                self.move_r()
-            elif turn == CubeTurn.L:
-                self.move_l()
-            elif turn == CubeTurn.F:
-                self.move_f()
-            elif turn == CubeTurn.B:
-                self.move_b()
-            elif turn == CubeTurn.U:
-                self.move_u()
-            elif turn == CubeTurn.D:
-                self.move_d()
-            elif turn == CubeTurn.x:
-                self.rotate_x()
-            elif turn == CubeTurn.y:
-                self.rotate_y()
-            elif turn == CubeTurn.z:
-                self.rotate_z()
+class _FaceNet:
+    """
+    Face-by-face model of the cube net, where each move shuffles the squares of
+    the Face objects around. Only used to derive the move permutations, so the
+    permutation engine used by Cube gives exactly the same results.
+    """
+
+    def __init__(self, faces):
+        for name, face in zip(FACES, faces):
+            setattr(self, name, face)
+
+    def faces(self):
+        """ Gets the faces, in the order given by FACES """
+        return [getattr(self, name) for name in FACES]
+
+    def quarter_turn(self, turn):
+        """ Performs a single clockwise quarter turn """
+        {
+            CubeTurn.R: self.move_r,
+            CubeTurn.L: self.move_l,
+            CubeTurn.F: self.move_f,
+            CubeTurn.B: self.move_b,
+            CubeTurn.U: self.move_u,
+            CubeTurn.D: self.move_d,
+            CubeTurn.x: self.rotate_x,
+            CubeTurn.y: self.rotate_y,
+            CubeTurn.z: self.rotate_z,
+        }[turn]()
 
     def move_r(self):
         """ Makes an 'R' move """
@@ -310,6 +424,367 @@ class Cube:
         self.right = new_right
         self.right.rotate()
 
+
+IDENTITY = tuple(range(FACELET_COUNT))
+
+
+def compose_permutations(first, second):
+    """ Makes the permutation for applying first and then second """
+    return tuple(first[i] for i in second)
+
+
+def _derive_permutation(turn, turns):
+    """
+    Works out where each facelet comes from after the given move.
+    The result maps the new position of each facelet to its old position.
+    """
+    if turn in COMPOSITE_TURNS:
+        quarter = IDENTITY
+        for move in parse_moves(COMPOSITE_TURNS[turn]):
+            quarter = compose_permutations(
+                quarter, _derive_permutation(move.turn, move.turns))
+        permutation = IDENTITY
+        for _ in range(turns):
+            permutation = compose_permutations(permutation, quarter)
+        return permutation
+    net = _FaceNet(
+        [Face(list(range(9 * i, 9 * i + 9))) for i in range(len(FACES))])
+    for _ in range(turns):
+        net.quarter_turn(turn)
+    return tuple(square for face in net.faces() for square in face.squares)
+
+# Every move the cube can make, along with its facelet permutation
+MOVES = tuple(
+    CubeMove(turn, turns) for turn in CubeTurn for turns in (1, 2, 3))
+MOVE_PERMUTATIONS = tuple(
+    _derive_permutation(move.turn, move.turns) for move in MOVES)
+MOVE_INDICES = {(move.turn, move.turns): i for i, move in enumerate(MOVES)}
+
+# Applies the permutation for (turn, turns % 4) to the facelets (as a tuple)
+MOVE_GETTERS = {(turn, 0): itemgetter(*IDENTITY) for turn in CubeTurn}
+MOVE_GETTERS.update({(move.turn, move.turns): itemgetter(*perm)
+                     for move, perm in zip(MOVES, MOVE_PERMUTATIONS)})
+
+
+def move_index(move):
+    """ Gets the index of the move in MOVES (and MOVE_PERMUTATIONS) """
+    return MOVE_INDICES[move.turn, move.turns % 4]
+
+
+def invert_moves(moves):
+    """ Gets the list of moves which undoes a sequence of moves """
+    return [move.inverse() for move in reversed(list(moves))]
+
+
+def moves_to_string(moves):
+    """
+    Gets the normalised notation for a sequence of moves, which is used to key
+    the compiled move cache
+    """
+    return " ".join(str(move) for move in moves if move.turns % 4)
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_move_string(move_string):
+    """ Composes the permutations of the moves in a normalised move string """
+    permutation = IDENTITY
+    for move in parse_moves(move_string):
+        permutation = compose_permutations(
+            permutation, MOVE_PERMUTATIONS[move_index(move)])
+    return permutation
+
+
+def compile_moves(moves):
+    """
+    Compiles a sequence of moves (a list of CubeMoves, or a move string) into a
+    single facelet permutation, which can be given to Cube.apply_permutation
+    Compiled sequences are kept in an LRU cache.
+    """
+    if isinstance(moves, str):
+        return _compile_move_string(" ".join(moves.split()))
+    return _compile_move_string(moves_to_string(moves))
+
+
+def invert_permutation(permutation):
+    """ Makes the permutation undoing the given one """
+    inverse = [0] * len(permutation)
+    for i, source in enumerate(permutation):
+        inverse[source] = i
+    return tuple(inverse)
+
+
+# The non-rotation move with each permutation
+_MOVES_BY_PERMUTATION = {
+    permutation: move
+    for move, permutation in zip(MOVES, MOVE_PERMUTATIONS)
+    if move.turn not in ROTATION_TURNS
+}
+
+
+@functools.lru_cache(maxsize=None)
+def relabel_move(frame, index):
+    """
+    Gets the move (turn, turns) which, made before the rotations giving the
+    frame permutation, matches making MOVES[index] after them
+    """
+    permutation = compose_permutations(
+        compose_permutations(frame, MOVE_PERMUTATIONS[index]),
+        invert_permutation(frame))
+    move = _MOVES_BY_PERMUTATION[permutation]
+    return move.turn, move.turns
+
+
+def _orientation_frames():
+    """
+    Makes the tables for tracking whole cube rotations as an orientation frame
+    Returns the frame permutations (the 24 rotations, reached by x, y and z
+    turns), and a table for each frame from (turn, turns) to the getter of the
+    move to make before the frame (or None) and the frame afterwards.
+    """
+    frames = [IDENTITY]
+    frame_indices = {IDENTITY: 0}
+    tables = []
+    for frame_index, frame in enumerate(frames):
+        table = {(turn, 0): (None, frame_index) for turn in CubeTurn}
+        for i, move in enumerate(MOVES):
+            if move.turn in ROTATION_TURNS:
+                rotated = compose_permutations(frame, MOVE_PERMUTATIONS[i])
+                if rotated not in frame_indices:
+                    frame_indices[rotated] = len(frames)
+                    frames.append(rotated)
+                table[move.turn, move.turns] = (None, frame_indices[rotated])
+            else:
+                table[move.turn, move.turns] = (
+                    MOVE_GETTERS[relabel_move(frame, i)], frame_index)
+        tables.append(table)
+    return frames, tables
+
+
+# Frame 0 is the identity (the facelets are as stored)
+FRAME_PERMUTATIONS, _FRAME_MOVES = _orientation_frames()
+_FRAME_GETTERS = tuple(
+    itemgetter(*permutation) for permutation in FRAME_PERMUTATIONS)
+
+# Bits used for each facelet colour in a packed state key
+KEY_BITS = 3
+_COLORS_BY_VALUE = {color.value: color for color in SquareColor}
+SOLVED_VALUES = bytes(
+    color.value for color in SOLVED_COLORS for _ in range(9))
+
+
+def pack_facelets(values):
+    """
+    Packs facelet colour values (as in Cube.color_values) into an int, KEY_BITS
+    per facelet (first facelet in the lowest bits)
+    """
+    key = 0
+    for value in reversed(values):
+        key = (key << KEY_BITS) | value
+    return key
+
+
+def unpack_facelets(key):
+    """ Unpacks the facelet colour values (bytes) from a packed state key """
+    mask = (1 << KEY_BITS) - 1
+    return bytes(key >> (KEY_BITS * i) & mask for i in range(FACELET_COUNT))
+
+
+def _face_property(index):
+    """ Makes a property giving a copy of one face of the cube """
+    start = 9 * index
+
+    def getter(self):
+        return Face([_COLORS_BY_VALUE[value]
+                     for value in self.color_values[start:start + 9]])
+
+    def setter(self, face):
+        values = self.color_values
+        self.color_values = (values[:start] +
+                             bytes(color.value for color in face.squares) +
+                             values[start + 9:])
+
+    return property(getter, setter, doc="The {} face".format(FACES[index]))
+
+
+class Cube:
+    """
+    The Rubik's cube model
+    The state is the 54 facelet colour values (see FACES). Each move applies
+    its precomputed permutation in one step, leaving the tuple itemgetter
+    gives, which is packed into bytes when the state is read, compared or
+    copied; SquareColors are only made when the facelets or faces are read.
+    Whole cube rotations only change an orientation frame (one of the 24
+    rotations, applied after the stored facelets): later moves are relabelled
+    through the frame (after x, an F is stored as a D), and the rotated
+    facelets are only worked out when they are next read.
+    """
+
+    __slots__ = ("_facelets", "_frame")
+
+    top = _face_property(0)
+    right = _face_property(1)
+    front = _face_property(2)
+    bottom = _face_property(3)
+    left = _face_property(4)
+    back = _face_property(5)
+
+    def __init__(self):
+        self._facelets = SOLVED_VALUES
+        self._frame = 0
+
+    @property
+    def color_values(self):
+        """ The bytes of the 54 facelet colour values (see FACES) """
+        if self._frame:
+            self._facelets = _FRAME_GETTERS[self._frame](self._facelets)
+            self._frame = 0
+        if not isinstance(self._facelets, bytes):
+            self._facelets = bytes(self._facelets)
+        return self._facelets
+
+    @color_values.setter
+    def color_values(self, values):
+        self._facelets = bytes(values)
+        self._frame = 0
+
+    @property
+    def facelets(self):
+        """ The flat tuple of the 54 facelet colours (see FACES) """
+        return tuple(map(_COLORS_BY_VALUE.__getitem__, self.color_values))
+
+    @facelets.setter
+    def facelets(self, facelets):
+        self.color_values = bytes(color.value for color in facelets)
+
+    @classmethod
+    def from_facelet_string(cls, facelet_string):
+        """
+        Creates a cube from a facelet string, which gives the face letter (see
+        FACE_LETTERS) of each facelet in order
+        """
+        if len(facelet_string) != FACELET_COUNT:
+            raise ValueError("Facelet string should be {} characters long".
+                             format(FACELET_COUNT))
+        try:
+            values = bytes(SOLVED_COLORS[FACE_LETTERS.index(letter)].value
+                           for letter in facelet_string)
+        except ValueError as err:
+            raise ValueError(
+                "Invalid facelet string '{}'".format(facelet_string)) from err
+        cube = cls()
+        cube.color_values = values
+        return cube
+
+    def copy(self):
+        """
+        Creates a copy of the cube
+        The facelet bytes are immutable (moves replace them rather than change
+        them), so the copy shares them and only the new cube object is made.
+        """
+        cube = object.__new__(type(self))
+        cube._facelets = self.color_values
+        cube._frame = 0
+        return cube
+
+    def memory_size(self):
+        """ Gets the bytes used by the cube and its (shareable) facelet bytes """
+        return sys.getsizeof(self) + sys.getsizeof(self.color_values)
+
+    def to_facelet_string(self):
+        """ Gets the facelet string of the cube """
+        return "".join(
+            FACE_LETTERS[SOLVED_COLORS.index(color)] for color in self.facelets)
+
+    def __eq__(self, other):
+        return (isinstance(other, Cube)
+                and self.color_values == other.color_values)
+
+    def __hash__(self):
+        # note: a cube's hash changes when it moves, so don't move cubes that
+        # are in a set (or use state_key() instead)
+        return hash(self.color_values)
+
+    def is_solved(self):
+        """ Whether every face is one colour (in any orientation) """
+        values = self.color_values
+        return all(
+            values[start:start + 9].count(values[start + 4]) == 9
+            for start in range(0, FACELET_COUNT, 9))
+
+    def state_key(self):
+        """ Gets the state as a compact int (see pack_facelets) """
+        return pack_facelets(self.color_values)
+
+    @classmethod
+    def from_state_key(cls, key):
+        """ Creates a cube from a state key """
+        cube = cls()
+        cube.color_values = unpack_facelets(key)
+        return cube
+
+    def make_move(self, move):
+        """ Given a move, make it """
+        getter, frame = _FRAME_MOVES[self._frame][move.turn, move.turns % 4]
+        if getter is None:
+            self._frame = frame
+        else:
+            self._facelets = getter(self._facelets)
+
+    def apply_permutation(self, permutation):
+        """
+        Moves the facelets as given by a permutation (e.g. from compile_moves),
+        which maps the new position of each facelet to its old position
+        """
+        self._facelets = itemgetter(*permutation)(self.color_values)
+
+    def make_moves(self, moves):
+        """ Makes a sequence of moves, compiled into a single permutation """
+        self.apply_permutation(compile_moves(moves))
+
+    def _turn(self, turn):
+        """ Makes a single clockwise quarter turn """
+        getter, frame = _FRAME_MOVES[self._frame][turn, 1]
+        if getter is None:
+            self._frame = frame
+        else:
+            self._facelets = getter(self._facelets)
+
+    def move_r(self):
+        """ Makes an 'R' move """
+        self._turn(CubeTurn.R)
+
+    def move_l(self):
+        """ Makes an 'L' move """
+        self._turn(CubeTurn.L)
+
+    def move_u(self):
+        """ Makes an 'U' move """
+        self._turn(CubeTurn.U)
+
+    def move_d(self):
+        """ Makes an 'D' move """
+        self._turn(CubeTurn.D)
+
+    def move_f(self):
+        """ Makes an 'F' move """
+        self._turn(CubeTurn.F)
+
+    def move_b(self):
+        """ Makes an 'B' move """
+        self._turn(CubeTurn.B)
+
+    def rotate_x(self):
+        """ Performs an 'x' rotation """
+        self._turn(CubeTurn.x)
+
+    def rotate_y(self):
+        """ Performs an 'y' rotation """
+        self._turn(CubeTurn.y)
+
+    def rotate_z(self):
+        """ Performs an 'z' rotation """
+        self._turn(CubeTurn.z)
+
     def __str__(self):
         """ String representation of cube """
         return (
@@ -324,6 +799,191 @@ class Cube:
                 nl=os.linesep)
 
 
+# Facelets of each corner position (URF, UFL, ULB, UBR, DFR, DLF, DBL, DRB),
+# listed clockwise starting with the U/D facelet
+CORNER_FACELETS = ((8, 9, 20), (6, 18, 38), (0, 36, 47), (2, 45, 11),
+                   (29, 26, 15), (27, 44, 24), (33, 53, 42), (35, 17, 51))
+# Facelets of each edge position (UR, UF, UL, UB, DR, DF, DL, DB, FR, FL, BL,
+# BR), starting with the U/D facelet (or F/B facelet for the middle layer)
+EDGE_FACELETS = ((5, 10), (7, 19), (3, 37), (1, 46), (32, 16), (28, 25),
+                 (30, 43), (34, 52), (23, 12), (21, 41), (50, 39), (48, 14))
+# The faces (index into FACES) of each corner and edge cubie, in the same order
+CORNER_FACES = tuple(
+    tuple(i // 9 for i in facelets) for facelets in CORNER_FACELETS)
+EDGE_FACES = tuple(
+    tuple(i // 9 for i in facelets) for facelets in EDGE_FACELETS)
+CORNER_COUNT = len(CORNER_FACELETS)
+EDGE_COUNT = len(EDGE_FACELETS)
+
+
+def permutation_parity(permutation):
+    """ Gets the parity of a permutation (0 for even, 1 for odd) """
+    parity = 0
+    for i, value in enumerate(permutation):
+        for other in permutation[i + 1:]:
+            if other < value:
+                parity ^= 1
+    return parity
+
+
+class CubieCube:
+    """
+    Cubie level representation of the cube
+    cp[i] is the corner cubie in corner position i, and co[i] its twist (0-2),
+    likewise ep[i] and eo[i] (0-1) for the edges (see CORNER_FACELETS and
+    EDGE_FACELETS for the positions).
+    """
+
+    def __init__(self, cp=None, co=None, ep=None, eo=None):
+        self.cp = list(range(CORNER_COUNT)) if cp is None else list(cp)
+        self.co = [0] * CORNER_COUNT if co is None else list(co)
+        self.ep = list(range(EDGE_COUNT)) if ep is None else list(ep)
+        self.eo = [0] * EDGE_COUNT if eo is None else list(eo)
+
+    def __eq__(self, other):
+        return (isinstance(other, CubieCube) and self.cp == other.cp
+                and self.co == other.co and self.ep == other.ep
+                and self.eo == other.eo)
+
+    def __repr__(self):
+        return "CubieCube(cp={}, co={}, ep={}, eo={})".format(
+            self.cp, self.co, self.ep, self.eo)
+
+    def copy(self):
+        """ Creates a copy of the cubie cube """
+        return CubieCube(self.cp, self.co, self.ep, self.eo)
+
+    def multiply(self, other):
+        """
+        Applies other after self, in place
+        (e.g. multiplying by the cubie cube of a move makes that move)
+        """
+        cp, co, ep, eo = self.cp, self.co, self.ep, self.eo
+        self.cp = [cp[i] for i in other.cp]
+        self.co = [(co[i] + twist) % 3 for i, twist in zip(other.cp, other.co)]
+        self.ep = [ep[i] for i in other.ep]
+        self.eo = [eo[i] ^ flip for i, flip in zip(other.ep, other.eo)]
+
+    def inverse(self):
+        """ Creates the inverse cubie cube """
+        cp = [0] * CORNER_COUNT
+        co = [0] * CORNER_COUNT
+        ep = [0] * EDGE_COUNT
+        eo = [0] * EDGE_COUNT
+        for i, corner in enumerate(self.cp):
+            cp[corner] = i
+            co[corner] = -self.co[i] % 3
+        for i, edge in enumerate(self.ep):
+            ep[edge] = i
+            eo[edge] = self.eo[i]
+        return CubieCube(cp, co, ep, eo)
+
+    def verify(self):
+        """
+        Checks the cubie cube is a reachable state
+        Raises a ValueError describing the problem if it is not.
+        """
+        if sorted(self.cp) != list(range(CORNER_COUNT)):
+            raise ValueError("Invalid corner permutation {}".format(self.cp))
+        if sorted(self.ep) != list(range(EDGE_COUNT)):
+            raise ValueError("Invalid edge permutation {}".format(self.ep))
+        if any(twist not in (0, 1, 2) for twist in self.co):
+            raise ValueError("Invalid corner orientation {}".format(self.co))
+        if any(flip not in (0, 1) for flip in self.eo):
+            raise ValueError("Invalid edge orientation {}".format(self.eo))
+        if sum(self.co) % 3:
+            raise ValueError("A corner is twisted")
+        if sum(self.eo) % 2:
+            raise ValueError("An edge is flipped")
+        if permutation_parity(self.cp) != permutation_parity(self.ep):
+            raise ValueError("Two cubies are swapped")
+
+    @classmethod
+    def from_facelets(cls, facelets):
+        """
+        Creates the cubie cube for a flat list of facelet colours (as in
+        Cube.facelets), where the centres give the colour of each face
+        Raises a ValueError if the facelets are not a reachable state.
+        """
+        if len(facelets) != FACELET_COUNT:
+            raise ValueError("Expected {} facelets, got {}".format(
+                FACELET_COUNT, len(facelets)))
+        face_of = {facelets[9 * face + 4]: face for face in range(len(FACES))}
+        if len(face_of) != len(FACES):
+            raise ValueError("Centre colours are not all different")
+        try:
+            faces = [face_of[color] for color in facelets]
+        except KeyError as err:
+            raise ValueError(
+                "Colour {} is not on any centre".format(err)) from err
+        for face in range(len(FACES)):
+            if faces.count(face) != 9:
+                raise ValueError("There are {} {} facelets, expected 9".format(
+                    faces.count(face), facelets[9 * face + 4]))
+        cubie = cls()
+        for i, corner in enumerate(CORNER_FACELETS):
+            colors = [faces[j] for j in corner]
+            for twist in range(3):
+                if colors[twist] in (0, 3):
+                    break
+            else:
+                raise ValueError("Corner {} has no U or D facelet".format(i))
+            key = (colors[twist], colors[(twist + 1) % 3],
+                   colors[(twist + 2) % 3])
+            if key not in _CORNER_LOOKUP:
+                raise ValueError("Corner {} has invalid colours".format(i))
+            cubie.cp[i] = _CORNER_LOOKUP[key]
+            cubie.co[i] = twist
+        for i, edge in enumerate(EDGE_FACELETS):
+            colors = tuple(faces[j] for j in edge)
+            if colors in _EDGE_LOOKUP:
+                cubie.ep[i] = _EDGE_LOOKUP[colors]
+                cubie.eo[i] = 0
+            elif colors[::-1] in _EDGE_LOOKUP:
+                cubie.ep[i] = _EDGE_LOOKUP[colors[::-1]]
+                cubie.eo[i] = 1
+            else:
+                raise ValueError("Edge {} has invalid colours".format(i))
+        cubie.verify()
+        return cubie
+
+    @classmethod
+    def from_cube(cls, cube):
+        """ Creates the cubie cube for the state of a Cube """
+        return cls.from_facelets(cube.facelets)
+
+    def to_facelets(self, colors=SOLVED_COLORS):
+        """ Gets the flat list of facelet colours for the cubie cube """
+        facelets = [colors[i // 9] for i in range(FACELET_COUNT)]
+        for i, (corner, twist) in enumerate(zip(self.cp, self.co)):
+            for n in range(3):
+                facelets[CORNER_FACELETS[i][(n + twist) % 3]] = colors[
+                    CORNER_FACES[corner][n]]
+        for i, (edge, flip) in enumerate(zip(self.ep, self.eo)):
+            for n in range(2):
+                facelets[EDGE_FACELETS[i][(n + flip) % 2]] = colors[
+                    EDGE_FACES[edge][n]]
+        return tuple(facelets)
+
+    def to_cube(self):
+        """ Creates a Cube in the state of the cubie cube """
+        self.verify()
+        cube = Cube()
+        cube.facelets = self.to_facelets()
+        return cube
+
+
+_CORNER_LOOKUP = {faces: i for i, faces in enumerate(CORNER_FACES)}
+_EDGE_LOOKUP = {faces: i for i, faces in enumerate(EDGE_FACES)}
+
+# The cubie cube of each move in MOVES (cubies are placed relative to the
+# centres, so the whole cube rotations are all the identity)
+CUBIE_MOVES = tuple(
+    CubieCube.from_facelets(
+        tuple(SOLVED_COLORS[i // 9] for i in permutation))
+    for permutation in MOVE_PERMUTATIONS)
+
+
 def main():
     """ Entry point """
     moves = "U D"
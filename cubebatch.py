@@ -0,0 +1,107 @@
+""" Vectorised simulation of many Rubik's cubes at once """
+import numpy as np
+
+from cube import (Cube, FACE_TURNS, FACELET_COUNT, MOVES, MOVE_PERMUTATIONS,
+                  SOLVED_COLORS, compile_moves, move_index)
+
+# (number of moves, 54) table of facelet permutations, indexed as MOVES
+PERMUTATION_TABLE = np.array(MOVE_PERMUTATIONS, dtype=np.intp)
+SOLVED_STATE = np.array(
+    [color.value for color in SOLVED_COLORS for _ in range(9)], dtype=np.uint8)
+
+# The outer face turns (no slices or rotations), grouped 3 per face as MOVES
+FACE_TURN_INDICES = np.array(
+    [i for i, move in enumerate(MOVES) if move.turn in FACE_TURNS],
+    dtype=np.intp)
+
+
+class CubeBatch:
+    """
+    Holds the states of N cubes as an (N, 54) array of SquareColor values
+    (faces ordered as cube.FACES), so moves can be made on all of them at once
+    """
+
+    def __init__(self, states):
+        states = np.asarray(states, dtype=np.uint8)
+        if states.ndim != 2 or states.shape[1] != FACELET_COUNT:
+            raise ValueError("Expected an (N, {}) array of states, got {}".
+                             format(FACELET_COUNT, states.shape))
+        self.states = states
+
+    @classmethod
+    def solved(cls, n):
+        """ Creates a batch of n solved cubes """
+        return cls(np.tile(SOLVED_STATE, (n, 1)))
+
+    @classmethod
+    def from_cubes(cls, cubes):
+        """ Creates a batch holding the states of the given Cube objects """
+        states = np.frombuffer(b"".join(cube.color_values for cube in cubes),
+                               dtype=np.uint8)
+        return cls(states.reshape(-1, FACELET_COUNT))
+
+    def to_cubes(self):
+        """ Converts the states back into Cube objects """
+        cubes = []
+        for state in self.states:
+            cube = Cube()
+            cube.color_values = state.tobytes()
+            cubes.append(cube)
+        return cubes
+
+    def __len__(self):
+        return len(self.states)
+
+    def apply_permutation(self, permutation):
+        """ Applies a single facelet permutation to every cube """
+        self.states = self.states[:, permutation]
+
+    def apply_move(self, move):
+        """ Makes the same move on every cube """
+        self.apply_permutation(PERMUTATION_TABLE[move_index(move)])
+
+    def apply_moves(self, moves):
+        """ Makes the same sequence of moves on every cube """
+        self.apply_permutation(np.array(compile_moves(moves), dtype=np.intp))
+
+    def apply_move_indices(self, indices):
+        """
+        Makes a (possibly different) move on each cube
+        indices holds one index into cube.MOVES for each cube in the batch
+        """
+        permutations = PERMUTATION_TABLE[np.asarray(indices, dtype=np.intp)]
+        self.states = np.take_along_axis(self.states, permutations, axis=1)
+
+    def is_solved(self):
+        """ Gets a boolean array of which cubes have every face one colour """
+        faces = self.states.reshape(len(self), len(SOLVED_COLORS), 9)
+        return (faces == faces[:, :, 4:5]).all(axis=(1, 2))
+
+
+def random_move_indices(n, length, rng=None):
+    """
+    Makes an (n, length) array of random face turns (indices into cube.MOVES)
+    Consecutive moves never turn the same face, as in a normal scramble.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    faces = len(FACE_TURN_INDICES) // 3
+    face = np.empty((n, length), dtype=np.intp)
+    if length:
+        face[:, 0] = rng.integers(0, faces, n)
+        # shift by 1..faces-1 from the previous face, so it never repeats
+        shifts = rng.integers(1, faces, (n, length - 1))
+        face[:, 1:] = (face[:, :1] + np.cumsum(shifts, axis=1)) % faces
+    turns = rng.integers(0, 3, (n, length))
+    return FACE_TURN_INDICES[face * 3 + turns]
+
+
+def random_walk(n, length, rng=None):
+    """
+    Scrambles n solved cubes with random move sequences of the given length
+    Returns the batch along with the (n, length) array of move indices made.
+    """
+    indices = random_move_indices(n, length, rng)
+    batch = CubeBatch.solved(n)
+    for step in range(length):
+        batch.apply_move_indices(indices[:, step])
+    return batch, indices
@@ -1,167 +1,155 @@
 """ Takes cube objects and formats them for rendering """
+import functools
 import math
-import lab_utils as lu
-from cube import SquareColor
+
+import numpy as np
+
+from bigcube import BigCube
+from cube import FACES, SquareColor
 
 SPACING = 0.05
-FRONT_TRANS = lambda row, col: lu.make_translation(SPACING + col, SPACING + (2 - row), -SPACING)
-TOP_TRANS = lambda row, col: lu.make_translation(SPACING + col, 3 - SPACING, -SPACING - 2 + row)
-RIGHT_TRANS = lambda row, col: lu.make_translation(3 - SPACING, 2 - row + SPACING, -SPACING - col)
+# Size of the whole cube, whatever its number of layers
+EXTENT = 3
+# Offset of the square in each row and column of a face of a cube with n
+# layers, from the square drawn on the x-y plane (see make_rect) after the
+# face's rotation (in layer widths, scaled to EXTENT afterwards)
+FRONT_TRANS = lambda row, col, n: (SPACING + col, SPACING + (n - 1 - row),
+                                   -SPACING)
+TOP_TRANS = lambda row, col, n: (SPACING + col, n - SPACING,
+                                 -SPACING - (n - 1) + row)
+RIGHT_TRANS = lambda row, col, n: (n - SPACING, n - 1 - row + SPACING,
+                                   -SPACING - col)
+BACK_TRANS = lambda row, col, n: (SPACING + n - 1 - col,
+                                  SPACING + (n - 1 - row), -n + SPACING)
+BOTTOM_TRANS = lambda row, col, n: (SPACING + col, SPACING, -SPACING - row)
+LEFT_TRANS = lambda row, col, n: (SPACING, n - 1 - row + SPACING,
+                                  -SPACING - (n - 1) + col)
+
+NO_ROTATION = np.identity(3)
+X_ROTATION = np.array([[1, 0, 0], [0, math.cos(-math.pi / 2),
+                                   -math.sin(-math.pi / 2)],
+                       [0, math.sin(-math.pi / 2),
+                        math.cos(-math.pi / 2)]])
+Y_ROTATION = np.array([[math.cos(math.pi / 2), 0, math.sin(math.pi / 2)],
+                       [0, 1, 0],
+                       [-math.sin(math.pi / 2), 0, math.cos(math.pi / 2)]])
+
+# (rotation, offset of each square) of the outer faces, in drawing order
+OUTER_FACES = ((NO_ROTATION, FRONT_TRANS), (X_ROTATION, TOP_TRANS),
+               (Y_ROTATION, RIGHT_TRANS), (NO_ROTATION, BACK_TRANS),
+               (X_ROTATION, BOTTOM_TRANS), (Y_ROTATION, LEFT_TRANS))
+# (rotation, offset of each gap between layers, offset of each square) of the
+# inner squares (the black faces between layers, seen while a layer turns)
+INNER_FACES = (
+    (NO_ROTATION, lambda i, n: (0, 0, -1 - i), FRONT_TRANS),
+    (NO_ROTATION, lambda i, n: (0, 0, -1 + 2 * SPACING - i), FRONT_TRANS),
+    (X_ROTATION, lambda i, n: (0, i + 1 - n, 0), TOP_TRANS),
+    (X_ROTATION, lambda i, n: (0, i + 1 - n + 2 * SPACING, 0), TOP_TRANS),
+    (Y_ROTATION, lambda i, n: (i + 1 - n, 0, 0), RIGHT_TRANS),
+    (Y_ROTATION, lambda i, n: (i + 1 - n + 2 * SPACING, 0, 0), RIGHT_TRANS),
+)
+# Faces (index into cube.FACES) of the outer squares, in drawing order
+OUTER_FACE_ORDER = tuple(
+    FACES.index(name)
+    for name in ("front", "top", "right", "back", "bottom", "left"))
+NORMALS = ([0.0, 0.0, 1.0], [0.0, 1.0, 0.0], [1.0, 0.0, 0.0], [0.0, 0.0, -1.0],
+           [0.0, -1.0, 0.0], [-1.0, 0.0, 0.0])
+
+
+def _square_transforms(size):
+    """
+    Gets the (squares, 3, 3) array of the rotation and (squares, 3) array of
+    the offset placing each square of a cube with size layers
+    """
+    rotations = []
+    offsets = []
+    for rotation, translation in OUTER_FACES:
+        for i in range(size * size):
+            rotations.append(rotation)
+            offsets.append(translation(i // size, i % size, size))
+    for rotation, base_translation, translation in INNER_FACES:
+        for j in range(size - 1):
+            for i in range(size * size):
+                rotations.append(rotation)
+                offsets.append(
+                    np.add(base_translation(j, size),
+                           translation(i // size, i % size, size)))
+    return np.array(rotations), np.array(offsets, dtype=float)
+
+
+@functools.lru_cache(maxsize=None)
+def square_vertices(size=3):
+    """
+    Gets the (4 * squares, 3) array of the corners of every square of a cube
+    with size layers, 4 per square (as drawn with GL_TRIANGLE_FAN)
+    The geometry is the same for every cube state, so it is worked out once,
+    with all squares transformed together, and then shared (read-only).
+    """
+    rotations, offsets = _square_transforms(size)
+    rect = np.array(make_rect(1 - 2 * SPACING, 1 - 2 * SPACING), dtype=float)
+    vertices = np.einsum("nij,vj->nvi", rotations, rect) + offsets[:, None]
+    vertices = (vertices.reshape(-1, 3) * (EXTENT / size)).astype(np.float32)
+    vertices.setflags(write=False)
+    return vertices
+
+
+@functools.lru_cache(maxsize=None)
+def square_facelets(size=3):
+    """
+    Gets the array of the facelet (index into the cube's color_values) shown
+    by each square, in the order of square_vertices (read-only)
+    The inner squares show the index just past the facelets, which is black.
+    """
+    area = size * size
+    facelets = np.array(
+        [area * face + i for face in OUTER_FACE_ORDER for i in range(area)] +
+        [len(FACES) * area] * (len(INNER_FACES) * (size - 1) * area),
+        dtype=np.intp)
+    facelets.setflags(write=False)
+    return facelets
+
+
+_BLACK = bytes([SquareColor.BLACK.value])
+
+
+@functools.lru_cache(maxsize=None)
+def square_normals(size=3):
+    """ Gets the (squares, 3) array of the normal to each square (read-only) """
+    area = size * size
+    # the outer faces, then the inner squares in pairs facing each way
+    normals = [normal for normal in NORMALS for _ in range(area)] + [
+        NORMALS[face] for face in (0, 3, 1, 4, 2, 5)
+        for _ in range((size - 1) * area)
+    ]
+    normals = np.array(normals)
+    normals.setflags(write=False)
+    return normals
 
 
 class CubeRenderer:
-    """ Breaks the Cube down into squares and colours to be drawn """
+    """
+    Breaks a Cube, or a bigcube.BigCube of any size, down into squares and
+    colours to be drawn (filling the same space whatever the size)
+    """
 
     def __init__(self, cube):
         self.cube = cube
+        self.size = cube.size if isinstance(cube, BigCube) else 3
 
     def get_colors(self):
-        """ Gets the list of square colors """
-        colors = []
-        colors.extend([square.value for square in self.cube.front.squares])
-        colors.extend([square.value for square in self.cube.top.squares])
-        colors.extend([square.value for square in self.cube.right.squares])
-        colors.extend([square.value for square in self.cube.back.squares])
-        colors.extend([square.value for square in self.cube.bottom.squares])
-        colors.extend([square.value for square in self.cube.left.squares])
-        colors.extend([SquareColor.BLACK.value for i in range(4 * 3 * 9)])
-        return colors
+        """ Gets the list of square colour values (see square_facelets) """
+        values = np.frombuffer(self.cube.color_values + _BLACK, dtype=np.uint8)
+        return values[square_facelets(self.size)].tolist()
 
     def get_squares(self):
-        """ Gets a list of squares to draw """
-        squares = []
-        self.__add_front_squares(squares)
-        self.__add_top_squares(squares)
-        self.__add_right_squares(squares)
-        self.__add_back_squares(squares)
-        self.__add_bottom_squares(squares)
-        self.__add_left_squares(squares)
-        CubeRenderer.__make_inner_squares(squares)
-        return squares
+        """ Gets the array of square corners to draw (see square_vertices) """
+        return square_vertices(self.size)
 
     def get_normals(self):
-        """ Gets the list of normals to each square """
-        norms = []
-        # front
-        norms.extend([[0.0, 0.0, 1.0] for _ in range(9)])
-        # # top
-        norms.extend([[0.0, 1.0, 0.0] for _ in range(9)])
-        # # right
-        norms.extend([[1.0, 0.0, 0.0] for _ in range(9)])
-        # # back
-        norms.extend([[0.0, 0.0, -1.0] for _ in range(9)])
-        # # bottom
-        norms.extend([[0.0, -1.0, 0.0] for _ in range(9)])
-        # # left
-        norms.extend([[-1.0, 0.0, 0.0] for _ in range(9)])
-
-        norms.extend([[0.0, 0.0, 1.0] for _ in range(2 * 9)])
-        norms.extend([[0.0, 0.0, -1.0] for _ in range(2 * 9)])
-        norms.extend([[0.0, 1.0, 0.0] for _ in range(2 * 9)])
-        norms.extend([[0.0, -1.0, 0.0] for _ in range(2 * 9)])
-        norms.extend([[1.0, 0.0, 0.0] for _ in range(2 * 9)])
-        norms.extend([[-1.0, 0.0, 0.0] for _ in range(2 * 9)])
-        return norms
-
-    def __add_front_squares(self, squares):
-        translation = FRONT_TRANS
-        CubeRenderer.__add_squares(self.cube.front.squares, squares, lu.Mat4(),
-                                   translation)
-
-    def __add_top_squares(self, squares):
-        translation = TOP_TRANS
-        rot_tfm = lu.make_rotation_x(-math.pi / 2)
-        CubeRenderer.__add_squares(self.cube.top.squares, squares, rot_tfm,
-                                   translation)
-
-    def __add_right_squares(self, squares):
-        translation = RIGHT_TRANS
-        rot_tfm = lu.make_rotation_y(math.pi / 2)
-        CubeRenderer.__add_squares(self.cube.right.squares, squares, rot_tfm,
-                                   translation)
-
-    def __add_back_squares(self, squares):
-        translation = lambda row, col: lu.make_translation(SPACING + 2 - col, SPACING + (2 - row), -3 + SPACING)
-        CubeRenderer.__add_squares(self.cube.front.squares, squares, lu.Mat4(),
-                                   translation)
-
-    def __add_bottom_squares(self, squares):
-        translation = lambda row, col: lu.make_translation(SPACING + col, SPACING, -SPACING - row)
-        rot_tfm = lu.make_rotation_x(-math.pi / 2)
-        CubeRenderer.__add_squares(self.cube.top.squares, squares, rot_tfm,
-                                   translation)
-
-    def __add_left_squares(self, squares):
-        translation = lambda row, col: lu.make_translation(SPACING, 2 - row + SPACING, -SPACING - 2 + col)
-        rot_tfm = lu.make_rotation_y(math.pi / 2)
-        CubeRenderer.__add_squares(self.cube.right.squares, squares, rot_tfm,
-                                   translation)
-
-    @staticmethod
-    def __add_squares(squares_in, squares_out, rot_tfm, translation):
-        base_rect = make_rect(1 - 2 * SPACING, 1 - 2 * SPACING)
-        for i in range(len(squares_in)):
-            col = i % 3
-            row = int(i / 3)
-            trans_tfm = translation(row, col)
-            tfm = trans_tfm * rot_tfm
-            squares_out.extend(apply_rect_transform(base_rect, tfm))
-
-    @staticmethod
-    def __add_inner_squares(squares_out, rot_tfm, base_trans, small_trans):
-        base_rect = make_rect(1 - 2 * SPACING, 1 - 2 * SPACING)
-        for j in range(2):
-            base_tfm = base_trans(j)
-            for i in range(9):
-                col = i % 3
-                row = int(i / 3)
-                small_tfm = small_trans(row, col)
-                tfm = small_tfm * base_tfm * rot_tfm
-                squares_out.extend(apply_rect_transform(base_rect, tfm))
-
-    @staticmethod
-    def __make_inner_squares(squares):
-        """ Makes the inner squares of the cube """
-        CubeRenderer.__make_inner_squares_front(squares)
-        CubeRenderer.__make_inner_squares_up(squares)
-        CubeRenderer.__make_inner_squares_right(squares)
-
-    @staticmethod
-    def __make_inner_squares_front(squares):
-        rot_tfm = lu.Mat4()
-        translation = lambda i: lu.make_translation(0, 0, -1 - i)
-        CubeRenderer.__add_inner_squares(squares, rot_tfm, translation,
-                                         FRONT_TRANS)
-        translation = lambda i: lu.make_translation(0, 0, -1 + 2 * SPACING - i)
-        CubeRenderer.__add_inner_squares(squares, rot_tfm, translation,
-                                         FRONT_TRANS)
-
-    @staticmethod
-    def __make_inner_squares_up(squares):
-        rot_tfm = lu.make_rotation_x(-math.pi / 2)
-        translation = lambda i: lu.make_translation(0, -2 + i, 0)
-        CubeRenderer.__add_inner_squares(squares, rot_tfm, translation,
-                                         TOP_TRANS)
-        translation = lambda i: lu.make_translation(0, -2 + 2 * SPACING + i, 0)
-        CubeRenderer.__add_inner_squares(squares, rot_tfm, translation,
-                                         TOP_TRANS)
-
-    @staticmethod
-    def __make_inner_squares_right(squares):
-        rot_tfm = lu.make_rotation_y(math.pi / 2)
-        translation = lambda i: lu.make_translation(-2 + i, 0, 0)
-        CubeRenderer.__add_inner_squares(squares, rot_tfm, translation,
-                                         RIGHT_TRANS)
-        translation = lambda i: lu.make_translation(-2 + 2 * SPACING + i, 0, 0)
-        CubeRenderer.__add_inner_squares(squares, rot_tfm, translation,
-                                         RIGHT_TRANS)
+        """ Gets the array of normals to each square (see square_normals) """
+        return square_normals(self.size)
 
 
 def make_rect(width, height):
     """ Makes a rectangle on x-y plane to be drawn with GL_TRIANGLES_FAN """
     return [[0, 0, 0], [0, height, 0], [width, height, 0], [width, 0, 0]]
-
-
-def apply_rect_transform(rect, transform):
-    """ Rotates rectangle vertices on given axes """
-    return [lu.transformPoint(transform, vert) for vert in rect]
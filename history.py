@@ -0,0 +1,150 @@
+"""
+Move history with undo, redo and seeking
+
+HistoryCube records every move made, so a move can be undone by making its
+inverse, and redone. The state is also saved every checkpoint_interval moves
+(states are immutable bytes, so a checkpoint is just a reference), so seeking
+to any point of a long session restores at most one checkpoint and replays
+fewer than checkpoint_interval moves.
+"""
+from cube import Cube, CubeMove, invert_permutation, parse_moves
+
+CHECKPOINT_INTERVAL = 256
+
+
+class HistoryCube(Cube):
+    """
+    Cube which records its moves
+    history holds the moves made (CubeMoves, or permutation tuples from
+    apply_permutation), and position how many of them are currently applied;
+    the rest were undone and can be redone, until a new move is made.
+    """
+
+    __slots__ = ("checkpoint_interval", "history", "position", "_checkpoints")
+
+    def __init__(self, checkpoint_interval=CHECKPOINT_INTERVAL):
+        super().__init__()
+        self.checkpoint_interval = checkpoint_interval
+        self.clear_history()
+
+    def clear_history(self):
+        """
+        Forgets the history, starting a new one from the current state (call
+        this after setting the facelets directly)
+        """
+        self.history = []
+        self.position = 0
+        # checkpoint i is the state after i * checkpoint_interval moves
+        self._checkpoints = [self.color_values]
+
+    def copy(self):
+        """
+        Creates a copy of the cube, with its own copy of the history (which
+        takes time in proportion to the length of the history)
+        """
+        cube = super().copy()
+        cube.checkpoint_interval = self.checkpoint_interval
+        cube.history = list(self.history)
+        cube.position = self.position
+        cube._checkpoints = list(self._checkpoints)
+        return cube
+
+    @classmethod
+    def from_facelet_string(cls, facelet_string):
+        """ Creates a cube from a facelet string, with an empty history """
+        cube = super().from_facelet_string(facelet_string)
+        cube.clear_history()
+        return cube
+
+    @classmethod
+    def from_state_key(cls, key):
+        """ Creates a cube from a state key, with an empty history """
+        cube = super().from_state_key(key)
+        cube.clear_history()
+        return cube
+
+    def _apply(self, entry, inverse=False):
+        """ Makes a history entry (or its inverse) without recording it """
+        if isinstance(entry, CubeMove):
+            Cube.make_move(self, entry.inverse() if inverse else entry)
+        else:
+            Cube.apply_permutation(
+                self, invert_permutation(entry) if inverse else entry)
+
+    def _record(self, entry):
+        """ Makes and records an entry, dropping any undone moves """
+        if self.position < len(self.history):
+            last_checkpoint = self.position // self.checkpoint_interval
+            del self.history[self.position:]
+            del self._checkpoints[last_checkpoint + 1:]
+        self._apply(entry)
+        self.history.append(entry)
+        self.position += 1
+        if self.position % self.checkpoint_interval == 0:
+            self._checkpoints.append(self.color_values)
+
+    def make_move(self, move):
+        """ Given a move, make it (and record it) """
+        self._record(move)
+
+    def _turn(self, turn):
+        """ Makes (and records) a single clockwise quarter turn """
+        self._record(CubeMove(turn))
+
+    def apply_permutation(self, permutation):
+        """ Moves the facelets as given by a permutation (and records it) """
+        self._record(tuple(permutation))
+
+    def make_moves(self, moves):
+        """
+        Makes (and records) each of a sequence of moves (CubeMoves, or a move
+        string)
+        """
+        if isinstance(moves, str):
+            moves = parse_moves(moves)
+        for move in moves:
+            self._record(move)
+
+    def can_undo(self):
+        """ Whether there is a move to undo """
+        return self.position > 0
+
+    def can_redo(self):
+        """ Whether there is an undone move to redo """
+        return self.position < len(self.history)
+
+    def undo(self):
+        """ Undoes the last move, returning it """
+        if not self.can_undo():
+            raise ValueError("No moves to undo")
+        self.position -= 1
+        entry = self.history[self.position]
+        self._apply(entry, inverse=True)
+        return entry
+
+    def redo(self):
+        """ Redoes the last undone move, returning it """
+        if not self.can_redo():
+            raise ValueError("No moves to redo")
+        entry = self.history[self.position]
+        self._apply(entry)
+        self.position += 1
+        return entry
+
+    def seek(self, position):
+        """
+        Moves to the state after the first position moves of the history
+        Nearby positions are reached by undoing or redoing moves, and others by
+        restoring the checkpoint before them and replaying from there.
+        """
+        if not 0 <= position <= len(self.history):
+            raise ValueError("Position {} is outside the history (0 to {})".
+                             format(position, len(self.history)))
+        if abs(position - self.position) >= self.checkpoint_interval:
+            checkpoint = position // self.checkpoint_interval
+            self.color_values = self._checkpoints[checkpoint]
+            self.position = checkpoint * self.checkpoint_interval
+        while self.position > position:
+            self.undo()
+        while self.position < position:
+            self.redo()
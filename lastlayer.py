@@ -0,0 +1,291 @@
+"""
+Recognition of last layer cases (OLL, PLL, ZBLL and so on)
+
+A CaseIndex is built from a list of (name, algorithm) cases, such as PLL_CASES
+or OLL_CASES, or a set read from a file with read_cases. Each case is stored
+under the key of every state its algorithm solves: the state the inverse of
+the algorithm makes, with each U turn before and after it. So recognising a
+state is one dictionary lookup (or, for arrays of states, one sorted array
+search), which also gives the U turns to make before and after the algorithm.
+
+Keys pack the 21 stickers of the U layer, with each colour given as the face
+whose centre has it, so they do not depend on the colour scheme. "colors" keys
+hold every sticker's face (3 bits each), and "orientation" keys only whether
+each sticker has the U colour (1 bit each), which is all OLL needs. The first
+two layers are assumed to be solved.
+"""
+import argparse
+
+import numpy as np
+
+from cube import (FACELET_COUNT, FACES, Cube, CubeMove, CubeTurn,
+                  invert_moves, moves_to_string, parse_moves)
+from statefile import face_indices
+
+# The U face, then the top rows of the R, F, L and B faces
+LAST_LAYER_FACELETS = tuple(range(9)) + tuple(
+    9 * face + i for face in (1, 2, 4, 5) for i in range(3))
+PATTERNS = {"colors": 3, "orientation": 1}
+_LAST_LAYER = np.array(LAST_LAYER_FACELETS, dtype=np.intp)
+_OTHER_FACELETS = tuple(
+    i for i in range(FACELET_COUNT) if i not in LAST_LAYER_FACELETS)
+
+PLL_CASES = (
+    ("Aa", "x R' U R' D2 R U' R' D2 R2 x'"),
+    ("Ab", "x R2 D2 R U R' D2 R U' R x'"),
+    ("E", "x' R U' R' D R U R' D' R U R' D R U' R' D' x"),
+    ("F", "R' U' F' R U R' U' R' F R2 U' R' U' R U R' U R"),
+    ("Ga", "R2 U R' U R' U' R U' R2 U' D R' U R D'"),
+    ("Gb", "R' U' R U D' R2 U R' U R U' R U' R2 D"),
+    ("Gc", "R2 U' R U' R U R' U R2 U D' R U' R' D"),
+    ("Gd", "R U R' U' D R2 U' R U' R' U R' U R2 D'"),
+    ("H", "M2 U M2 U2 M2 U M2"),
+    ("Ja", "R' U L' U2 R U' R' U2 R L U'"),
+    ("Jb", "R U R' F' R U R' U' R' F R2 U' R' U'"),
+    ("Na", "R U R' U R U R' F' R U R' U' R' F R2 U' R' U2 R U' R'"),
+    ("Nb", "R' U R U' R' F' U' F R U R' F R' F' R U' R"),
+    ("Ra", "R U' R' U' R U R D R' U' R D' R' U2 R' U'"),
+    ("Rb", "R2 F R U R U' R' F' R U2 R' U2 R"),
+    ("T", "R U R' U' R' F R2 U' R' U' R U R' F'"),
+    ("Ua", "R U' R U R U R U' R' U' R2"),
+    ("Ub", "R2 U R U R' U' R' U' R' U R'"),
+    ("V", "R' U R' U' y R' F' R2 U' R' U R' F R F"),
+    ("Y", "F R U' R' U' R U R' F' R U R' U' R' F R F'"),
+    ("Z", "M2 U M2 U M' U2 M2 U2 M'"),
+)
+
+_OLL_ALGORITHMS = (
+    "R U2 R2 F R F' U2 R' F R F'",
+    "F R U R' U' F' f R U R' U' f'",
+    "f R U R' U' f' U' F R U R' U' F'",
+    "f R U R' U' f' U F R U R' U' F'",
+    "r' U2 R U R' U r",
+    "r U2 R' U' R U' r'",
+    "r U R' U R U2 r'",
+    "l' U' L U' L' U2 l",
+    "R U R' U' R' F R2 U R' U' F'",
+    "R U R' U R' F R F' R U2 R'",
+    "r U R' U R' F R F' R U2 r'",
+    "M' R' U' R U' R' U2 R U' M",
+    "F U R U' R2 F' R U R U' R'",
+    "R' F R U R' F' R F U' F'",
+    "r' U' r R' U' R U r' U r",
+    "r U r' R U R' U' r U' r'",
+    "R U R' U R' F R F' U2 R' F R F'",
+    "r U R' U R U2 r2 U' R U' R' U2 r",
+    "r' R U R U R' U' M' R' F R F'",
+    "r U R' U' M2 U R U' R' U' M'",
+    "R U2 R' U' R U R' U' R U' R'",
+    "R U2 R2 U' R2 U' R2 U2 R",
+    "R2 D' R U2 R' D R U2 R",
+    "r U R' U' r' F R F'",
+    "F' r U R' U' r' F R",
+    "R U2 R' U' R U' R'",
+    "R U R' U R U2 R'",
+    "r U R' U' r' R U R U' R'",
+    "R U R' U' R U' R' F' U' F R U R'",
+    "F R' F R2 U' R' U' R U R' F2",
+    "R' U' F U R U' R' F' R",
+    "L U F' U' L' U L F L'",
+    "R U R' U' R' F R F'",
+    "R U R2 U' R' F R U R U' F'",
+    "R U2 R2 F R F' R U2 R'",
+    "L' U' L U' L' U L U L F' L' F",
+    "F R' F' R U R U' R'",
+    "R U R' U R U' R' U' R' F R F'",
+    "L F' L' U' L U F U' L'",
+    "R' F R U R' U' F' U R",
+    "R U R' U R U2 R' F R U R' U' F'",
+    "R' U' R U' R' U2 R F R U R' U' F'",
+    "F' U' L' U L F",
+    "F U R U' R' F'",
+    "F R U R' U' F'",
+    "R' U' R' F R F' U R",
+    "R' U' R' F R F' R' F R F' U R",
+    "F R U R' U' R U R' U' F'",
+    "r U' r2 U r2 U r2 U' r",
+    "r' U r2 U' r2 U' r2 U r'",
+    "F U R U' R' U R U' R' F'",
+    "R U R' U R U' B U' B' R'",
+    "l' U2 L U L' U' L U L' U l",
+    "r U2 R' U' R U R' U' R U' r'",
+    "R' F R U R U' R2 F' R2 U' R' U R U R'",
+    "r' U' r U' R' U R U' R' U R r' U r",
+    "R U R' U' M' U R U' r'",
+)
+OLL_CASES = tuple(("OLL {}".format(number), algorithm)
+                  for number, algorithm in enumerate(_OLL_ALGORITHMS, 1))
+
+
+def last_layer_key(facelets, pattern="colors"):
+    """
+    Gets the key of the U layer of a state, from its 54 facelet colours (as in
+    Cube.facelets, or their values as in Cube.color_values)
+    """
+    face_of = {facelets[9 * face + 4]: face for face in range(len(FACES))}
+    key = 0
+    if pattern == "orientation":
+        for i in reversed(LAST_LAYER_FACELETS):
+            key = (key << 1) | (facelets[i] == facelets[4])
+        return key
+    for i in reversed(LAST_LAYER_FACELETS):
+        key = (key << 3) | face_of.get(facelets[i], len(FACES))
+    return key
+
+
+def last_layer_keys(states, pattern="colors"):
+    """
+    Gets the keys (as a uint64 array) of the U layers of an (N, 54) array of
+    states (or a CubeBatch)
+    """
+    faces = face_indices(states)[:, _LAST_LAYER]
+    if pattern == "orientation":
+        faces = faces == 0
+    shifts = np.arange(len(LAST_LAYER_FACELETS),
+                       dtype=np.uint64) * np.uint64(PATTERNS[pattern])
+    return (faces.astype(np.uint64) << shifts).sum(axis=1, dtype=np.uint64)
+
+
+def read_cases(path):
+    """
+    Reads a case set from a text file of "name: algorithm" lines (blank lines
+    and lines starting with # are skipped)
+    """
+    cases = []
+    with open(path) as case_file:
+        for line_number, line in enumerate(case_file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, separator, algorithm = line.partition(":")
+            if not separator:
+                raise ValueError("Line {} of {} is not 'name: algorithm'".
+                                 format(line_number, path))
+            cases.append((name.strip(), algorithm.strip()))
+    return cases
+
+
+def _u_turns(turns):
+    """ Gets the moves of a U turn (none for 0 quarter turns) """
+    return [CubeMove(CubeTurn.U, turns)] if turns % 4 else []
+
+
+class CaseIndex:
+    """
+    Index from the U layer of a state to its case in a set of last layer
+    cases (see the module docstring)
+    Raises a ValueError if an algorithm moves pieces outside the U layer, or
+    two algorithms solve the same case.
+    """
+
+    def __init__(self, cases, pattern="colors"):
+        if pattern not in PATTERNS:
+            raise ValueError("Unknown pattern '{}'".format(pattern))
+        self.pattern = pattern
+        self.names = [name for name, _ in cases]
+        self.algorithms = [parse_moves(algorithm) for _, algorithm in cases]
+        # key -> (case, U turns before the algorithm, U turns after it)
+        self._index = {}
+        for case, algorithm in enumerate(self.algorithms):
+            self._add_case(case, algorithm)
+        keys = sorted(self._index)
+        self._keys = np.array(keys, dtype=np.uint64)
+        self._entries = np.array([self._index[key] for key in keys],
+                                 dtype=np.int64).reshape(-1, 3)
+
+    def _add_case(self, case, algorithm):
+        """ Adds the keys of every U turn before and after a case """
+        inverse = invert_moves(algorithm)
+        for after in range(4):
+            for before in range(4):
+                cube = Cube()
+                cube.make_moves(_u_turns(after) + inverse + _u_turns(before))
+                facelets = cube.color_values
+                if not after and not before:
+                    self._check_first_layers(case, facelets)
+                key = last_layer_key(facelets, self.pattern)
+                entry = self._index.setdefault(key,
+                                               (case, -before % 4, -after % 4))
+                if entry[0] != case:
+                    raise ValueError("{} and {} solve the same case".format(
+                        self.names[entry[0]], self.names[case]))
+
+    def _check_first_layers(self, case, facelets):
+        """ Checks a case state has the first two layers solved """
+        face_of = {facelets[9 * face + 4]: face for face in range(len(FACES))}
+        if any(face_of[facelets[i]] != i // 9 for i in _OTHER_FACELETS):
+            raise ValueError("{} moves pieces outside the U layer".format(
+                self.names[case]))
+
+    def __len__(self):
+        return len(self.names)
+
+    def recognize(self, cube):
+        """
+        Gets the (case, U turns before, U turns after) solving a cube with
+        its first two layers solved, or None if the U layer is not a case
+        """
+        return self._index.get(last_layer_key(cube.color_values, self.pattern))
+
+    def solution(self, cube):
+        """
+        Gets the moves solving the U layer of a cube (the U turn, algorithm
+        and U turn of its case), or None if it is not a case
+        """
+        match = self.recognize(cube)
+        if match is None:
+            return None
+        case, before, after = match
+        return _u_turns(before) + list(self.algorithms[case]) + _u_turns(after)
+
+    def recognize_states(self, states):
+        """
+        Recognises an (N, 54) array of states (or a CubeBatch), giving the
+        (N, 3) array of each state's case, U turns before and U turns after,
+        with -1 for the case of states which are not in the index
+        """
+        keys = last_layer_keys(states, self.pattern)
+        positions = np.searchsorted(self._keys, keys)
+        positions = np.minimum(positions, max(len(self._keys) - 1, 0))
+        matches = np.full((len(keys), 3), -1, dtype=np.int64)
+        if not len(self._keys):
+            return matches
+        found = self._keys[positions] == keys
+        matches[found] = self._entries[positions[found]]
+        return matches
+
+
+CASE_SETS = {
+    "pll": (PLL_CASES, "colors"),
+    "oll": (OLL_CASES, "orientation"),
+}
+
+
+def main():
+    """ Entry point """
+    parser = argparse.ArgumentParser(
+        description="Recognise the last layer case after some moves")
+    parser.add_argument("moves", help="moves making the state, e.g. a scramble")
+    parser.add_argument("--set", choices=sorted(CASE_SETS), default="pll",
+                        help="built in case set to recognise")
+    parser.add_argument("--cases", help="file of 'name: algorithm' lines to "
+                        "use instead of a built in set")
+    parser.add_argument("--pattern", choices=sorted(PATTERNS),
+                        help="key pattern of the case file")
+    args = parser.parse_args()
+    cases, pattern = CASE_SETS[args.set]
+    if args.cases:
+        cases = read_cases(args.cases)
+    index = CaseIndex(cases, args.pattern or pattern)
+    cube = Cube()
+    cube.make_moves(parse_moves(args.moves))
+    match = index.recognize(cube)
+    if match is None:
+        print("Not a case")
+        return
+    print("{}: {}".format(index.names[match[0]],
+                          moves_to_string(index.solution(cube))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Optimal Rubik's cube solver, using IDA* with pattern databases
+
+The pattern databases give the exact number of moves needed to solve the
+corners, and two groups of 6 edges. They are stored with 4 bits per entry and
+memory mapped from the cache directory, so solver processes share them.
+"""
+import math
+import sys
+import time
+
+import numpy as np
+
+import coords
+import solver
+from cube import CUBIE_MOVES, MOVES, Cube, CubieCube, moves_to_string
+
+N_MOVES = len(coords.FACE_MOVES)
+# The two groups of edges with a pattern database each
+EDGE_GROUPS = ((0, 1, 2, 3, 4, 5), (6, 7, 8, 9, 10, 11))
+GROUP_SIZE = 6
+# Ways of placing the 6 edges of a group into the 12 edge positions
+N_EDGE_PLACEMENTS = math.factorial(12) // math.factorial(12 - GROUP_SIZE)
+N_EDGE_ORIENTATIONS = 2**GROUP_SIZE
+N_EDGE_STATES = N_EDGE_PLACEMENTS * N_EDGE_ORIENTATIONS
+
+# Where the edge in each position goes, and whether it is flipped, for each move
+_EDGE_DESTINATIONS = np.zeros((N_MOVES, 12), dtype=np.int64)
+_EDGE_FLIPS = np.zeros((N_MOVES, 12), dtype=np.int64)
+for _i, _move in enumerate(coords.FACE_MOVES):
+    for _position, _source in enumerate(CUBIE_MOVES[_move].ep):
+        _EDGE_DESTINATIONS[_i, _source] = _position
+        _EDGE_FLIPS[_i, _source] = CUBIE_MOVES[_move].eo[_position]
+
+
+def rank_placements(positions):
+    """
+    Ranks (N, 6) arrays of distinct edge positions (0 <= rank < 12!/6!)
+    Each position is replaced with its index among the positions not used
+    earlier in the row, and those digits read in a mixed radix 12, 11, ... 7.
+    """
+    ranks = np.zeros(len(positions), dtype=np.int64)
+    for i in range(GROUP_SIZE):
+        earlier = (positions[:, :i] < positions[:, i:i + 1]).sum(axis=1)
+        ranks = ranks * (12 - i) + positions[:, i] - earlier
+    return ranks
+
+
+def unrank_placements(ranks):
+    """ Gets the (N, 6) array of edge positions for an array of ranks """
+    ranks = np.asarray(ranks, dtype=np.int64)
+    digits = np.zeros((len(ranks), GROUP_SIZE), dtype=np.int64)
+    for i in range(GROUP_SIZE - 1, -1, -1):
+        ranks, digits[:, i] = np.divmod(ranks, 12 - i)
+    positions = np.zeros_like(digits)
+    unused = np.ones((len(ranks), 12), dtype=bool)
+    rows = np.arange(len(ranks))
+    for i in range(GROUP_SIZE):
+        # the position is the (digit + 1)th one still unused
+        counts = np.cumsum(unused, axis=1)
+        positions[:, i] = np.argmax(counts == digits[:, i:i + 1] + 1, axis=1)
+        unused[rows, positions[:, i]] = False
+    return positions
+
+
+def _edge_move_tables():
+    """
+    Makes the edge group move tables: for each placement rank and move, the new
+    placement rank and the mask of orientation bits flipped
+    """
+    positions = unrank_placements(np.arange(N_EDGE_PLACEMENTS))
+    placement_move = np.zeros((N_EDGE_PLACEMENTS, N_MOVES), dtype=np.int32)
+    flip_move = np.zeros((N_EDGE_PLACEMENTS, N_MOVES), dtype=np.uint8)
+    bits = 1 << np.arange(GROUP_SIZE)
+    for move in range(N_MOVES):
+        placement_move[:, move] = rank_placements(
+            _EDGE_DESTINATIONS[move][positions])
+        flip_move[:, move] = (_EDGE_FLIPS[move][positions] * bits).sum(axis=1)
+    return placement_move, flip_move
+
+
+def pack_nibbles(distances):
+    """ Packs an array of values below 16 into 4 bits each """
+    if distances.max() > 15:
+        raise ValueError("Values must fit in 4 bits")
+    if len(distances) % 2:
+        distances = np.append(distances, 0)
+    return (distances[0::2] | (distances[1::2] << 4)).astype(np.uint8)
+
+
+def _corner_database(move_tables):
+    """ Distances to solve the corners, indexed by corners * 3^7 + twist """
+    return pack_nibbles(
+        solver.build_prune_table(move_tables["corners"], move_tables["twist"],
+                                 coords.N_TWIST))
+
+
+def _edge_database(placement_move, flip_move, group):
+    """
+    Distances to solve a group of edges, indexed by placement * 2^6 + flips
+    (see edge_group_state)
+    """
+    placement_move = np.asarray(placement_move, dtype=np.int64)
+    flip_move = np.asarray(flip_move, dtype=np.int64)
+    solved = rank_placements(np.array([group]))[0] * N_EDGE_ORIENTATIONS
+
+    def neighbours(states):
+        placements, flips = np.divmod(states, N_EDGE_ORIENTATIONS)
+        return (placement_move[placements] * N_EDGE_ORIENTATIONS +
+                (flips[:, None] ^ flip_move[placements]))
+
+    return pack_nibbles(
+        solver.bfs_distances(N_EDGE_STATES, neighbours, start=solved))
+
+
+class PatternDatabases:
+    """ The move tables and pattern databases used by the optimal solver """
+
+    def __init__(self, cache_dir=None):
+        move_tables = coords.build_all(cache_dir)
+        edge_tables = {}
+
+        def edge_table(index):
+            if not edge_tables:
+                edge_tables["placement"], edge_tables["flip"] = (
+                    _edge_move_tables())
+            return edge_tables[index]
+
+        placement_move = coords.load_table(
+            "edge_placement_move", lambda: edge_table("placement"), cache_dir)
+        flip_move = coords.load_table("edge_flip_move",
+                                      lambda: edge_table("flip"), cache_dir)
+        corner_db = coords.load_table(
+            "corner_pdb", lambda: _corner_database(move_tables), cache_dir)
+        edge_dbs = [
+            coords.load_table(
+                "edge_pdb_{}".format(i),
+                lambda g=group: _edge_database(placement_move, flip_move, g),
+                cache_dir) for i, group in enumerate(EDGE_GROUPS)
+        ]
+        self.corners_move = solver.flat_view(move_tables["corners"])
+        self.twist_move = solver.flat_view(move_tables["twist"])
+        self.placement_move = solver.flat_view(placement_move)
+        self.flip_move = solver.flat_view(flip_move)
+        self.corner_db = solver.flat_view(corner_db)
+        self.edge_dbs = [solver.flat_view(database) for database in edge_dbs]
+
+
+_databases = {}
+
+
+def get_databases(cache_dir=None):
+    """ Gets the pattern databases, building or loading them on first use """
+    if cache_dir not in _databases:
+        _databases[cache_dir] = PatternDatabases(cache_dir)
+    return _databases[cache_dir]
+
+
+def edge_group_state(cubie, group):
+    """ Gets the pattern database index of a group of edges of a cubie cube """
+    positions = [cubie.ep.index(edge) for edge in group]
+    flips = sum(cubie.eo[position] << i for i, position in enumerate(positions))
+    placement = rank_placements(np.array([positions]))[0]
+    return int(placement) * N_EDGE_ORIENTATIONS + flips
+
+
+def _lookup(database, index):
+    """ Gets a 4 bit entry of a packed database """
+    return (database[index >> 1] >> ((index & 1) << 2)) & 0xf
+
+
+class OptimalSolver:
+    """
+    Finds shortest solutions with IDA*
+    After each solve, nodes and elapsed give the number of nodes searched and
+    the time taken.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.databases = get_databases(cache_dir)
+        self.nodes = 0
+        self.elapsed = 0.0
+        self._moves = []
+
+    @property
+    def nodes_per_second(self):
+        """ Search speed of the last solve """
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def _estimate(self, corners, twist, edges_a, edges_b):
+        """ Lower bound on the moves needed to solve the state """
+        databases = self.databases
+        return max(
+            _lookup(databases.corner_db, corners * coords.N_TWIST + twist),
+            _lookup(databases.edge_dbs[0], edges_a),
+            _lookup(databases.edge_dbs[1], edges_b))
+
+    def solve(self, cube, max_length=20):
+        """
+        Finds a shortest solution for a cube (a Cube or a facelet string), as a
+        list of CubeMoves, or None if it needs more than max_length moves
+        """
+        if isinstance(cube, str):
+            cube = Cube.from_facelet_string(cube)
+        cubie = CubieCube.from_cube(cube)
+        state = (coords.get_corners(cubie), coords.get_twist(cubie),
+                 edge_group_state(cubie, EDGE_GROUPS[0]),
+                 edge_group_state(cubie, EDGE_GROUPS[1]))
+        self.nodes = 0
+        self._moves = []
+        start = time.perf_counter()
+        solution = None
+        for depth in range(self._estimate(*state), max_length + 1):
+            if self._search(state, depth, -1):
+                solution = [
+                    MOVES[coords.FACE_MOVES[move]] for move in self._moves
+                ]
+                break
+        self.elapsed = time.perf_counter() - start
+        return solution
+
+    def _search(self, state, togo, last_face):
+        """ Depth limited search, True once the state is solved """
+        self.nodes += 1
+        if togo == 0:
+            # moves are pruned unless every database gives 0 afterwards, which
+            # only happens for the solved cube
+            return True
+        corners, twist, edges_a, edges_b = state
+        databases = self.databases
+        placement_a, flips_a = divmod(edges_a, N_EDGE_ORIENTATIONS)
+        placement_b, flips_b = divmod(edges_b, N_EDGE_ORIENTATIONS)
+        for move, face in _NEXT_MOVES[last_face]:
+            new_corners = databases.corners_move[corners * N_MOVES + move]
+            new_twist = databases.twist_move[twist * N_MOVES + move]
+            if _lookup(databases.corner_db,
+                       new_corners * coords.N_TWIST + new_twist) >= togo:
+                continue
+            index_a = placement_a * N_MOVES + move
+            new_edges_a = (
+                databases.placement_move[index_a] * N_EDGE_ORIENTATIONS +
+                (flips_a ^ databases.flip_move[index_a]))
+            if _lookup(databases.edge_dbs[0], new_edges_a) >= togo:
+                continue
+            index_b = placement_b * N_MOVES + move
+            new_edges_b = (
+                databases.placement_move[index_b] * N_EDGE_ORIENTATIONS +
+                (flips_b ^ databases.flip_move[index_b]))
+            if _lookup(databases.edge_dbs[1], new_edges_b) >= togo:
+                continue
+            self._moves.append(move)
+            if self._search((new_corners, new_twist, new_edges_a, new_edges_b),
+                            togo - 1, face):
+                return True
+            self._moves.pop()
+        return False
+
+
+_NEXT_MOVES = solver.following_moves(range(N_MOVES))
+
+
+def main():
+    """ Entry point: optimally solves the facelet string given as argument """
+    if len(sys.argv) != 2:
+        print("Usage: python optimal.py <facelet string>")
+        sys.exit(1)
+    optimal_solver = OptimalSolver()
+    solution = optimal_solver.solve(sys.argv[1])
+    print(moves_to_string(solution))
+    print("{} nodes in {:.2f}s ({:.0f} nodes/s)".format(
+        optimal_solver.nodes, optimal_solver.elapsed,
+        optimal_solver.nodes_per_second))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Runs a function over an iterable on a pool of worker processes
+
+Unlike multiprocessing.Pool.imap, which reads its whole input ahead of the
+results, only a bounded number of items are in flight at once, so inputs of
+any length are processed in constant memory.
+"""
+import collections
+import multiprocessing
+
+
+def ordered_imap(func, items, workers, max_pending, initializer=None,
+                 initargs=()):
+    """
+    Yields func(item) for each item, in order, calling func on a pool of
+    workers processes (each first running initializer(*initargs))
+    At most max_pending items are read ahead of the results yielded.
+    """
+    with multiprocessing.Pool(workers, initializer, initargs) as pool:
+        pending = collections.deque()
+        for item in items:
+            pending.append(pool.apply_async(func, (item, )))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
@@ -0,0 +1,243 @@
+"""
+Optional profiling of the cube model
+
+Hooks are callables taking (name, seconds), called after each instrumented
+operation with how long it took. While no hook is registered the operations
+are the original functions, untouched, so profiling costs nothing when it is
+not in use. Registering the first hook wraps them with timers, and removing
+the last one puts the originals back. Functions are replaced on their module
+and in every loaded module which imported them by name (from cube import
+iter_moves), and overrides of the instrumented methods in subclasses loaded so
+far (such as history.HistoryCube.make_move) are wrapped too. Generators (such
+as iter_moves) report the time spent producing their items, once they finish.
+
+Profile is a hook collecting call counts, total time and a histogram of call
+times for each operation, which can be exported as JSON or in the Prometheus
+text format, e.g.
+    with profiling() as profile:
+        run_simulation()
+    print(profile.to_prometheus())
+"""
+import contextlib
+import functools
+import inspect
+import json
+import sys
+import time
+
+import cube
+
+# (owner, attribute) of each instrumented operation
+TARGETS = tuple((cube.Cube, name) for name in (
+    "make_move", "move_r", "move_l", "move_u", "move_d", "move_f", "move_b",
+    "rotate_x", "rotate_y", "rotate_z")) + (
+        (cube.CubeMove, "parse"),
+        (cube, "parse_moves"),
+        (cube, "iter_moves"),
+    )
+
+# Upper bounds (in seconds) of the histogram buckets
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, float("inf"))
+
+_hooks = []
+# (owner, attribute) -> the original function, for every attribute replaced
+# while instrumented
+_originals = {}
+
+
+def target_name(owner, attribute):
+    """ Gets the name an operation is reported under (e.g. Cube.make_move) """
+    return "{}.{}".format(getattr(owner, "__qualname__", owner.__name__),
+                          attribute)
+
+
+def _timed(function, name):
+    """ Wraps a function to pass the time each call takes to the hooks """
+    if inspect.isgeneratorfunction(function):
+        return _timed_generator(function, name)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            for hook in _hooks:
+                hook(name, elapsed)
+
+    return wrapper
+
+
+def _timed_generator(function, name):
+    """
+    Wraps a generator function to pass the time spent in each generator (not
+    counting the time its caller spends between items) to the hooks
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        iterator = function(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            for hook in _hooks:
+                hook(name, elapsed)
+
+    return wrapper
+
+
+def _subclasses(owner):
+    """ Gets the subclasses of a class, and theirs, and so on """
+    for subclass in owner.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def _targets():
+    """
+    Gets the (owner, attribute) of each operation to instrument: TARGETS, and
+    overrides of the target methods in the subclasses loaded so far
+    """
+    targets = list(TARGETS)
+    for owner, attribute in TARGETS:
+        if not isinstance(owner, type):
+            continue
+        for subclass in _subclasses(owner):
+            if (attribute in vars(subclass)
+                    and (subclass, attribute) not in targets):
+                targets.append((subclass, attribute))
+    return targets
+
+
+def _replace(owner, attribute, wrapped):
+    """ Sets an attribute, remembering the original to restore """
+    _originals[owner, attribute] = vars(owner)[attribute]
+    setattr(owner, attribute, wrapped)
+
+
+def _instrument():
+    """ Replaces each target with a timed wrapper """
+    for owner, attribute in _targets():
+        # read the class __dict__, so classmethods stay classmethods
+        original = vars(owner)[attribute]
+        name = target_name(owner, attribute)
+        if isinstance(original, classmethod):
+            wrapped = classmethod(_timed(original.__func__, name))
+        else:
+            wrapped = _timed(original, name)
+        _replace(owner, attribute, wrapped)
+        if isinstance(owner, type):
+            continue
+        # modules which imported the function by name hold their own reference
+        for module in list(sys.modules.values()):
+            if module is owner or module is None:
+                continue
+            for imported_name, value in list(vars(module).items()):
+                if value is original:
+                    _replace(module, imported_name, wrapped)
+
+
+def _restore():
+    """ Puts the original targets back """
+    for (owner, attribute), original in _originals.items():
+        setattr(owner, attribute, original)
+    _originals.clear()
+
+
+def add_hook(hook):
+    """ Registers a hook, instrumenting the targets if it is the first one """
+    if not _hooks:
+        _instrument()
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """ Unregisters a hook, restoring the targets if it was the last one """
+    _hooks.remove(hook)
+    if not _hooks:
+        _restore()
+
+
+def enabled():
+    """ Whether any hook is registered """
+    return bool(_hooks)
+
+
+class Profile:
+    """
+    Hook collecting the number of calls, total time and a histogram of call
+    times (counts per bucket of BUCKETS) for each operation
+    """
+
+    def __init__(self):
+        self.stats = {}
+
+    def __call__(self, name, seconds):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = {
+                "count": 0,
+                "seconds": 0.0,
+                "buckets": [0] * len(BUCKETS)
+            }
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stats["buckets"][i] += 1
+                break
+
+    def reset(self):
+        """ Clears the collected statistics """
+        self.stats = {}
+
+    def to_json(self, **kwargs):
+        """ Exports the statistics as JSON (kwargs are given to json.dumps) """
+        return json.dumps(
+            {
+                "buckets": [str(bound) for bound in BUCKETS],
+                "operations": self.stats
+            }, **kwargs)
+
+    def to_prometheus(self, metric="cube_operation_seconds"):
+        """
+        Exports the statistics as a histogram in the Prometheus text format
+        (with cumulative buckets, labelled by operation)
+        """
+        lines = ["# TYPE {} histogram".format(metric)]
+        for name, stats in sorted(self.stats.items()):
+            total = 0
+            for bound, count in zip(BUCKETS, stats["buckets"]):
+                total += count
+                lines.append('{}_bucket{{operation="{}",le="{}"}} {}'.format(
+                    metric, name, "+Inf" if bound == float("inf") else bound,
+                    total))
+            lines.append('{}_sum{{operation="{}"}} {}'.format(
+                metric, name, stats["seconds"]))
+            lines.append('{}_count{{operation="{}"}} {}'.format(
+                metric, name, stats["count"]))
+        return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def profiling(hook=None):
+    """
+    Registers a hook (by default a new Profile) for the duration of a with
+    block, yielding it
+    """
+    hook = Profile() if hook is None else hook
+    add_hook(hook)
+    try:
+        yield hook
+    finally:
+        remove_hook(hook)
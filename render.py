@@ -1,4 +1,5 @@
 """ Renders the program """
+import argparse
 import sys
 from ctypes import c_float
 
@@ -9,7 +10,8 @@ from imgui.integrations.glfw import GlfwRenderer as ImGuiGlfwRenderer
 from PIL import Image
 
 import lab_utils as lu
-from cube import Cube, CubeMove
+from bigcube import BigCube, parse_big_moves
+from cube import Cube, iter_moves
 from cuberender import CubeRenderer
 
 
@@ -48,7 +50,10 @@ MOVE_TIME = 0.7
 
 
 def make_squares():
-    """ Makes the vertices to draw """
+    """
+    Makes the vertices to draw, and uploads them (they are the same whatever
+    the state, so this is only done once)
+    """
     global g_cube
     global g_squares
     global g_square_colors
@@ -72,6 +77,12 @@ def make_squares():
     glEnableVertexAttribArray(0)
 
 
+def update_colors():
+    """ Gets the colour of each square for the cube's current state """
+    global g_square_colors
+    g_square_colors = CubeRenderer(g_cube).get_colors()
+
+
 def make_texture_coords():
     """ Makes and buffers the list of texture coords """
     texture_coords = []
@@ -126,8 +137,12 @@ def render_frame(width, height):
     # Set the clear colour (i.e. background colour)
     glClearColor(0.7, 0.8, 1.0, 1.0)
 
-    make_squares()
-    make_texture_coords()
+    # The geometry never changes, so only the colours are updated each frame
+    if g_vertex_array is None:
+        make_squares()
+        make_texture_coords()
+    else:
+        update_colors()
 
     # Unbind the buffers
     glBindBuffer(GL_ARRAY_BUFFER, 0)
@@ -342,22 +357,16 @@ def run_program(title, start_width, start_height):
         impl.process_inputs()
 
 
-def add_move_buttons(move_name, move_func, btn_w):
+def add_move_buttons(move_name, btn_w):
     """
     Adds buttons for move, move2 and move'
     Performs moves if button pressed
     """
-    if imgui.button(move_name, btn_w):
-        move_func()
-    imgui.same_line()
-    if imgui.button(move_name + "2", btn_w):
-        move_func()
-        move_func()
-    imgui.same_line()
-    if imgui.button(move_name + "'", btn_w):
-        move_func()
-        move_func()
-        move_func()
+    for i, move in enumerate((move_name, move_name + "2", move_name + "'")):
+        if i:
+            imgui.same_line()
+        if imgui.button(move, btn_w):
+            g_cube.make_moves(move)
 
 
 def draw_ui():
@@ -394,15 +403,15 @@ def draw_ui():
         imgui.begin_group()
         imgui.text("Moves:")
 
-        add_move_buttons("F", g_cube.move_f, btn_w)
+        add_move_buttons("F", btn_w)
         imgui.same_line(spacing=20)
-        add_move_buttons("B", g_cube.move_b, btn_w)
-        add_move_buttons("R", g_cube.move_r, btn_w)
+        add_move_buttons("B", btn_w)
+        add_move_buttons("R", btn_w)
         imgui.same_line(spacing=20)
-        add_move_buttons("L", g_cube.move_l, btn_w)
-        add_move_buttons("U", g_cube.move_u, btn_w)
+        add_move_buttons("L", btn_w)
+        add_move_buttons("U", btn_w)
         imgui.same_line(spacing=20)
-        add_move_buttons("D", g_cube.move_d, btn_w)
+        add_move_buttons("D", btn_w)
 
         imgui.end_group()
 
@@ -411,9 +420,9 @@ def draw_ui():
         # Cube Rotations
         imgui.begin_group()
         imgui.text("Rotations:")
-        add_move_buttons("x", g_cube.rotate_x, btn_w)
-        add_move_buttons("y", g_cube.rotate_y, btn_w)
-        add_move_buttons("z", g_cube.rotate_z, btn_w)
+        add_move_buttons("x", btn_w)
+        add_move_buttons("y", btn_w)
+        add_move_buttons("z", btn_w)
         imgui.end_group()
 
         _, g_move_string = imgui.core.input_text("", g_move_string, 64)
@@ -492,14 +501,11 @@ def parse_moves():
 
 def parse_all_moves(moves_string):
     """ Parse a move string """
-    moves = []
-    if not moves_string:
+    if not moves_string.strip():
         raise ValueError("No Moves Given")
-    moves_strings = moves_string.split(" ")
-    for move_string in moves_strings:
-        move = CubeMove.parse(move_string)
-        moves.append(move)
-    return moves
+    if isinstance(g_cube, BigCube):
+        return parse_big_moves(moves_string, g_cube.size)
+    return list(iter_moves(moves_string))
 
 
 def update(dt):
@@ -549,5 +555,20 @@ def reload_shader():
             g_vert_shader_source = vert_shader
 
 
-if __name__ == "__main__":
+def main():
+    """ Entry point """
+    global g_cube
+    parser = argparse.ArgumentParser(description="Draw a Rubik's cube")
+    parser.add_argument("--size", type=int, default=3,
+                        help="number of layers of the cube (default 3)")
+    args = parser.parse_args()
+    if args.size != 3:
+        try:
+            g_cube = BigCube(args.size)
+        except ValueError as err:
+            parser.error(str(err))
     run_program("Rubik's Cube", 640, 640)
+
+
+if __name__ == "__main__":
+    main()
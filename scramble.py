@@ -0,0 +1,150 @@
+"""
+Random state scrambles
+
+A random move walk does not reach every state equally often, so instead a
+state is picked uniformly from all reachable states (a random cubie cube with
+the orientation and parity constraints fixed up), solved, and the inverse of
+the solution used as the scramble. States are picked in the main process, so a
+seed gives the same scrambles however many worker processes do the solving.
+The pure Python solver makes roughly 4-10 scrambles a second on each core.
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+
+import solver
+from cube import (CORNER_COUNT, EDGE_COUNT, CubieCube, invert_moves,
+                  moves_to_string, permutation_parity)
+from parallel import ordered_imap
+
+# Longest scramble wanted: the solver stops at the first solution this short,
+# which is quicker than asking for the shortest it can find
+SCRAMBLE_LENGTH = 24
+# Seconds the solver is given for each state
+TIMEOUT = 1.0
+# Times a worker retries a state the solver found nothing for in time, each
+# time with twice the timeout (and at least RETRY_TIMEOUT seconds)
+RETRIES = 3
+RETRY_TIMEOUT = 1.0
+
+
+def random_cubie(rng=None):
+    """
+    Picks a cubie cube uniformly at random from all reachable states
+    rng is a random.Random (by default the random module's own).
+    """
+    rng = rng or random
+    cp = list(range(CORNER_COUNT))
+    ep = list(range(EDGE_COUNT))
+    rng.shuffle(cp)
+    rng.shuffle(ep)
+    # swapping two edges pairs each odd permutation with an even one, so the
+    # parities are matched without favouring any state
+    if permutation_parity(cp) != permutation_parity(ep):
+        ep[0], ep[1] = ep[1], ep[0]
+    co = [rng.randrange(3) for _ in range(CORNER_COUNT - 1)]
+    co.append(-sum(co) % 3)
+    eo = [rng.randrange(2) for _ in range(EDGE_COUNT - 1)]
+    eo.append(sum(eo) % 2)
+    return CubieCube(cp, co, ep, eo)
+
+
+def random_state(rng=None):
+    """ Picks a Cube uniformly at random from all reachable states """
+    return random_cubie(rng).to_cube()
+
+
+def scramble_for(cube, max_length=SCRAMBLE_LENGTH, timeout=TIMEOUT,
+                 cache_dir=None):
+    """
+    Gets a scramble (a list of CubeMoves) taking a solved cube to the state of
+    a cube (a Cube or a facelet string)
+    Raises a ValueError if no solution is found within timeout seconds.
+    """
+    return invert_moves(
+        solver.solve(cube, max_length, timeout=timeout, cache_dir=cache_dir))
+
+
+def random_scramble(rng=None, **options):
+    """
+    Makes a random state scramble, as a list of CubeMoves
+    Options are passed on to scramble_for.
+    """
+    return scramble_for(random_state(rng), **options)
+
+
+# Options given to scramble_for in each worker
+_scramble_options = {}
+
+
+def _init_worker(options):
+    """ Loads the (memory mapped) solver tables once in each worker """
+    _scramble_options.update(options)
+    solver.get_tables(options.get("cache_dir"))
+
+
+def _scramble_in_worker(facelet_string):
+    """
+    Gets the scramble string for a state with the worker's options, retrying
+    with a longer timeout if the solver finds nothing in time (so one hard
+    state does not stop the whole run)
+    """
+    options = dict(_scramble_options)
+    timeout = options.pop("timeout", TIMEOUT)
+    for _ in range(RETRIES):
+        try:
+            return moves_to_string(
+                scramble_for(facelet_string, timeout=timeout, **options))
+        except ValueError:
+            timeout = max(2 * timeout, RETRY_TIMEOUT)
+    return moves_to_string(
+        scramble_for(facelet_string, timeout=timeout, **options))
+
+
+def generate_scrambles(n, workers=None, seed=None, max_pending=None,
+                       **options):
+    """
+    Yields n random state scramble strings, solved over a process pool
+    At most max_pending states (default 4 per worker) are waiting to be solved
+    at once. Other options are passed on to scramble_for.
+    """
+    rng = random.Random(seed)
+    workers = workers or multiprocessing.cpu_count()
+    max_pending = max_pending or 4 * workers
+    # build any missing tables once, before the workers start mapping them
+    solver.get_tables(options.get("cache_dir"))
+    states = (random_state(rng).to_facelet_string() for _ in range(n))
+    return ordered_imap(_scramble_in_worker, states, workers, max_pending,
+                        _init_worker, (options, ))
+
+
+def main():
+    """ Entry point """
+    parser = argparse.ArgumentParser(
+        description="Generate random state scrambles")
+    parser.add_argument("-n", "--count", type=int, default=1,
+                        help="number of scrambles to generate (default 1)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file to write scrambles to (default stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes (default all cores)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for reproducible scrambles")
+    parser.add_argument("--max-length", type=int, default=SCRAMBLE_LENGTH,
+                        help="longest scramble wanted (default {})".format(
+                            SCRAMBLE_LENGTH))
+    args = parser.parse_args()
+
+    out_file = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for scramble in generate_scrambles(args.count, args.workers, args.seed,
+                                           max_length=args.max_length):
+            out_file.write(scramble + "\n")
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+
+
+if __name__ == "__main__":
+    main()
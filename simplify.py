@@ -0,0 +1,57 @@
+"""
+Simplification of move sequences
+
+Turns about the same axis commute, so a run of them can be merged and written
+in a fixed order (R R -> R2, U D U' -> D, R R' -> nothing). Whole cube
+rotations can also be folded into the moves after them.
+"""
+from cube import (IDENTITY, MOVE_PERMUTATIONS, ROTATION_TURNS, CubeMove,
+                  CubeTurn, compose_permutations, move_index, relabel_move)
+
+# Turns about each axis (which all commute with each other)
+AXIS_TURNS = (
+    (CubeTurn.R, CubeTurn.L, CubeTurn.M, CubeTurn.Rw, CubeTurn.Lw, CubeTurn.x),
+    (CubeTurn.U, CubeTurn.D, CubeTurn.E, CubeTurn.Uw, CubeTurn.Dw, CubeTurn.y),
+    (CubeTurn.F, CubeTurn.B, CubeTurn.S, CubeTurn.Fw, CubeTurn.Bw, CubeTurn.z),
+)
+_AXIS_OF = {
+    turn: axis
+    for axis, turns in enumerate(AXIS_TURNS) for turn in turns
+}
+
+
+def simplify_moves(moves, fold_rotations=False):
+    """
+    Shortens a sequence of CubeMoves, without changing what it does
+    Runs of turns about the same axis commute, so they are merged (R R -> R2,
+    U D U' -> D, R R' -> nothing) and written in a fixed order.
+    With fold_rotations, x/y/z rotations are removed and the moves after them
+    relabelled (x F -> D), so the result only differs in the final
+    orientation of the whole cube.
+    """
+    frame = IDENTITY
+    # list of (axis, {turn: quarter turns}) for each run of turns on an axis
+    groups = []
+    for move in moves:
+        turn, turns = move.turn, move.turns % 4
+        if fold_rotations:
+            if turn in ROTATION_TURNS:
+                frame = compose_permutations(
+                    frame, MOVE_PERMUTATIONS[move_index(move)])
+                continue
+            if turns and frame is not IDENTITY:
+                turn, turns = relabel_move(frame, move_index(move))
+        if not turns:
+            continue
+        axis = _AXIS_OF[turn]
+        if not groups or groups[-1][0] != axis:
+            groups.append((axis, {}))
+        totals = groups[-1][1]
+        totals[turn] = (totals.get(turn, 0) + turns) % 4
+        if not any(totals.values()):
+            # everything cancelled, so the runs either side may now merge
+            groups.pop()
+    return [
+        CubeMove(turn, totals[turn]) for axis, totals in groups
+        for turn in AXIS_TURNS[axis] if totals.get(turn)
+    ]
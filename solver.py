@@ -0,0 +1,348 @@
+"""
+Two-phase (Kociemba) solver for the Rubik's cube
+
+Phase 1 searches the 18 face turns for a state in the subgroup
+<U, D, R2, L2, F2, B2> (no twisted corners, no flipped edges and the UD slice
+edges in the slice), then phase 2 solves the cube using only those moves.
+Both phases are iterative deepening searches over coordinates, pruned with
+distance tables that are built once and memory mapped from the cache directory.
+"""
+import sys
+import time
+
+import numpy as np
+
+import coords
+from cube import CUBIE_MOVES, MOVES, Cube, CubieCube, moves_to_string
+
+# Number of moves in the face turn tables (3 per face, faces ordered R L F B U D
+# so opposite faces are 2k and 2k + 1)
+N_MOVES = len(coords.FACE_MOVES)
+N_SLICE_ORDERS = 24
+UNSEEN = 255
+# Every state is at most this many moves from phase 2 (or from solved within
+# phase 2), and how deep phase 2 goes while trying shorter phase 1 solutions
+# once there is a solution
+PHASE1_MAX_DEPTH = 12
+PHASE2_MAX_DEPTH = 18
+PHASE2_EARLY_DEPTH = 12
+# Number of states expanded at once when building pruning tables
+BFS_CHUNK = 1 << 18
+
+
+def bfs_distances(size, neighbours, start=0):
+    """
+    Breadth-first search out from the start state over states 0..size-1,
+    giving the number of moves to reach each one (UNSEEN if it cannot be
+    reached)
+    neighbours(states) gives an array of the states one move away from each
+    of the given array of states.
+    """
+    distances = np.full(size, UNSEEN, dtype=np.uint8)
+    distances[start] = 0
+    frontier = np.array([start], dtype=np.int64)
+    depth = 0
+    while len(frontier):
+        depth += 1
+        # expand the frontier in chunks, to bound the memory used
+        for offset in range(0, len(frontier), BFS_CHUNK):
+            reached = neighbours(frontier[offset:offset + BFS_CHUNK]).ravel()
+            reached = reached[distances[reached] == UNSEEN]
+            distances[reached] = depth
+        frontier = np.flatnonzero(distances == depth)
+    return distances
+
+
+def build_prune_table(table_a, table_b, size_b):
+    """
+    Builds a pruning table for a pair of coordinates, giving the number of
+    moves needed to solve both (i.e. get both back to 0) for each index
+    a * size_b + b
+    table_a and table_b are move tables with the same columns of moves.
+    """
+    table_a = np.asarray(table_a, dtype=np.int64)
+    table_b = np.asarray(table_b, dtype=np.int64)
+
+    def neighbours(states):
+        coord_a, coord_b = np.divmod(states, size_b)
+        return table_a[coord_a] * size_b + table_b[coord_b]
+
+    return bfs_distances(len(table_a) * size_b, neighbours)
+
+
+def _slice_table(slice_sorted_table):
+    """ Move table of the slice position coordinate (slice_sorted // 24) """
+    return np.asarray(slice_sorted_table[::N_SLICE_ORDERS]) // N_SLICE_ORDERS
+
+
+def _phase2_table(table, size=None):
+    """ Restricts a move table to the phase 2 moves (and coordinates < size) """
+    return np.asarray(table[:size, list(coords.PHASE2_MOVES)])
+
+
+# name -> function building the pruning table from the move tables
+PRUNE_BUILDERS = {
+    "phase1_twist_slice":
+    lambda tables: build_prune_table(tables["twist"], _slice_table(tables[
+        "slice_sorted"]), coords.N_SLICE),
+    "phase1_flip_slice":
+    lambda tables: build_prune_table(tables["flip"], _slice_table(tables[
+        "slice_sorted"]), coords.N_SLICE),
+    "phase1_twist_flip":
+    lambda tables: build_prune_table(tables["twist"], tables["flip"], coords.
+                                     N_FLIP),
+    "phase2_corners_slice":
+    lambda tables: build_prune_table(
+        _phase2_table(tables["corners"]),
+        _phase2_table(tables["slice_sorted"], N_SLICE_ORDERS), N_SLICE_ORDERS),
+    "phase2_edges_slice":
+    lambda tables: build_prune_table(
+        _phase2_table(tables["ud_edges"]),
+        _phase2_table(tables["slice_sorted"], N_SLICE_ORDERS), N_SLICE_ORDERS),
+}
+
+
+def flat_view(table):
+    """
+    Gets a flat memoryview of a (memory mapped) table, which indexes to plain
+    ints much faster than NumPy while still sharing the mapped pages
+    """
+    return memoryview(np.ascontiguousarray(table).reshape(-1))
+
+
+class SolverTables:
+    """ The move and pruning tables used by the two-phase search """
+
+    def __init__(self, cache_dir=None):
+        move_tables = coords.build_all(cache_dir)
+        prune_tables = {
+            name: coords.load_table(name, lambda b=builder: b(move_tables),
+                                    cache_dir)
+            for name, builder in PRUNE_BUILDERS.items()
+        }
+        self.twist_move = flat_view(move_tables["twist"])
+        self.flip_move = flat_view(move_tables["flip"])
+        self.slice_move = flat_view(
+            _slice_table(move_tables["slice_sorted"]).astype(np.int32))
+        self.slice_sorted_move = flat_view(move_tables["slice_sorted"])
+        self.corners_move = flat_view(move_tables["corners"])
+        self.ud_edges_move = flat_view(move_tables["ud_edges"])
+        self.twist_slice_prune = flat_view(prune_tables["phase1_twist_slice"])
+        self.flip_slice_prune = flat_view(prune_tables["phase1_flip_slice"])
+        self.twist_flip_prune = flat_view(prune_tables["phase1_twist_flip"])
+        self.corners_slice_prune = flat_view(
+            prune_tables["phase2_corners_slice"])
+        self.edges_slice_prune = flat_view(prune_tables["phase2_edges_slice"])
+
+
+_tables = {}
+
+
+def get_tables(cache_dir=None):
+    """ Gets the solver tables, loading them on first use """
+    if cache_dir not in _tables:
+        _tables[cache_dir] = SolverTables(cache_dir)
+    return _tables[cache_dir]
+
+
+class SolveTimeout(Exception):
+    """ Raised inside the search once the time budget has run out """
+
+
+class _Search:
+    """ State of a single two-phase search """
+
+    def __init__(self, cubie, tables, max_length, deadline):
+        self.cubie = cubie
+        self.tables = tables
+        self.max_length = max_length
+        self.deadline = deadline
+        self.moves = []
+        self.best = None
+        self.nodes = 0
+
+    def _check_time(self):
+        """ Stops the search if it is out of time """
+        self.nodes += 1
+        if self.nodes & 0x3ff == 0 and time.perf_counter() > self.deadline:
+            raise SolveTimeout()
+
+    def run(self):
+        """
+        Searches until a short enough solution is found or time runs out,
+        returning the shortest solution found (None if there is none yet)
+        """
+        tables = self.tables
+        twist = coords.get_twist(self.cubie)
+        flip = coords.get_flip(self.cubie)
+        slice_ = coords.get_slice_sorted(self.cubie) // N_SLICE_ORDERS
+        depth = self._phase1_estimate(twist, flip, slice_, tables)
+        try:
+            while self.best is None or depth < len(self.best):
+                if self._phase1(twist, flip, slice_, depth, -1):
+                    break
+                depth += 1
+        except SolveTimeout:
+            pass
+        return self.best
+
+    @staticmethod
+    def _phase1_estimate(twist, flip, slice_, tables):
+        """ Lower bound on the moves left to finish phase 1 """
+        return max(tables.twist_slice_prune[twist * coords.N_SLICE + slice_],
+                   tables.flip_slice_prune[flip * coords.N_SLICE + slice_],
+                   tables.twist_flip_prune[twist * coords.N_FLIP + flip])
+
+    def _phase1(self, twist, flip, slice_, togo, last_face):
+        """
+        Depth limited phase 1 search
+        Returns True once a solution of at most max_length moves is found.
+        """
+        self._check_time()
+        if togo == 0:
+            # a phase 1 solution ending in a phase 2 move was already covered
+            # by a shorter phase 1 solution
+            if self.moves and self.moves[-1] in _PHASE2_MOVE_SET:
+                return False
+            return self._start_phase2()
+        tables = self.tables
+        twist_row = twist * N_MOVES
+        flip_row = flip * N_MOVES
+        slice_row = slice_ * N_MOVES
+        for move, face in _PHASE1_NEXT_MOVES[last_face]:
+            new_twist = tables.twist_move[twist_row + move]
+            new_flip = tables.flip_move[flip_row + move]
+            new_slice = tables.slice_move[slice_row + move]
+            if (tables.twist_slice_prune[new_twist * coords.N_SLICE + new_slice]
+                    >= togo or tables.flip_slice_prune[
+                        new_flip * coords.N_SLICE + new_slice] >= togo
+                    or tables.twist_flip_prune[new_twist * coords.N_FLIP +
+                                               new_flip] >= togo):
+                continue
+            self.moves.append(move)
+            found = self._phase1(new_twist, new_flip, new_slice, togo - 1, face)
+            self.moves.pop()
+            if found:
+                return True
+        return False
+
+    def _start_phase2(self):
+        """ Runs phase 2 from the end of the current phase 1 solution """
+        if self.best is None:
+            # any solution is kept as the best so far, even one longer than
+            # max_length, so there is something to return when time runs out
+            limit = PHASE2_MAX_DEPTH
+        else:
+            limit = len(self.best) - 1 - len(self.moves)
+            if len(self.moves) < PHASE1_MAX_DEPTH:
+                # long phase 2 searches are slow and rarely give short
+                # solutions, so try more phase 1 solutions first
+                limit = min(limit, PHASE2_EARLY_DEPTH)
+        if limit < 0:
+            return False
+        cubie = self.cubie.copy()
+        for move in self.moves:
+            cubie.multiply(_CUBIE_FACE_MOVES[move])
+        corners = coords.get_corners(cubie)
+        ud_edges = coords.get_ud_edges(cubie)
+        slice_sorted = coords.get_slice_sorted(cubie)
+        last_face = self.moves[-1] // 3 if self.moves else -1
+        phase1_length = len(self.moves)
+        depth = self._phase2_estimate(corners, ud_edges, slice_sorted)
+        while depth <= limit:
+            if self._phase2(corners, ud_edges, slice_sorted, depth, last_face):
+                self.best = list(self.moves)
+                del self.moves[phase1_length:]
+                return len(self.best) <= self.max_length
+            depth += 1
+        return False
+
+    def _phase2_estimate(self, corners, ud_edges, slice_sorted):
+        """ Lower bound on the moves left to finish phase 2 """
+        tables = self.tables
+        return max(
+            tables.corners_slice_prune[corners * N_SLICE_ORDERS + slice_sorted],
+            tables.edges_slice_prune[ud_edges * N_SLICE_ORDERS + slice_sorted])
+
+    def _phase2(self, corners, ud_edges, slice_sorted, togo, last_face):
+        """ Depth limited phase 2 search, True when the cube is solved """
+        self._check_time()
+        if togo == 0:
+            return corners == 0 and ud_edges == 0 and slice_sorted == 0
+        tables = self.tables
+        corners_row = corners * N_MOVES
+        edges_row = ud_edges * N_MOVES
+        slice_row = slice_sorted * N_MOVES
+        for move, face in _PHASE2_NEXT_MOVES[last_face]:
+            new_corners = tables.corners_move[corners_row + move]
+            new_edges = tables.ud_edges_move[edges_row + move]
+            new_slice = tables.slice_sorted_move[slice_row + move]
+            if (tables.corners_slice_prune[new_corners * N_SLICE_ORDERS +
+                                           new_slice] >= togo
+                    or tables.edges_slice_prune[new_edges * N_SLICE_ORDERS +
+                                                new_slice] >= togo):
+                continue
+            self.moves.append(move)
+            if self._phase2(new_corners, new_edges, new_slice, togo - 1, face):
+                return True
+            self.moves.pop()
+        return False
+
+
+def following_moves(moves):
+    """
+    For each last face turned (-1 for none), gets the (move, face) pairs that
+    can follow it: never the same face again, and of two opposite faces (which
+    commute) only in the order 2k then 2k + 1
+    """
+    next_moves = {}
+    for last_face in range(-1, N_MOVES // 3):
+        next_moves[last_face] = tuple(
+            (move, move // 3) for move in moves
+            if move // 3 != last_face and not (
+                move // 3 == last_face - 1 and last_face % 2 == 1))
+    return next_moves
+
+
+_CUBIE_FACE_MOVES = [CUBIE_MOVES[move] for move in coords.FACE_MOVES]
+_PHASE2_MOVE_SET = frozenset(coords.PHASE2_MOVES)
+_PHASE1_NEXT_MOVES = following_moves(range(N_MOVES))
+_PHASE2_NEXT_MOVES = following_moves(coords.PHASE2_MOVES)
+
+
+def solve(cube, max_length=21, timeout=1.0, cache_dir=None, strict=False):
+    """
+    Solves a cube (a Cube or a facelet string) with the two-phase algorithm
+    Returns the first solution (a list of CubeMoves) with at most max_length
+    moves. If there is none by the time timeout seconds have passed, the
+    shortest solution found is returned instead, which is longer than
+    max_length (or with strict=True, a ValueError is raised).
+    Raises a ValueError if the cube cannot be solved, or no solution was found
+    in time.
+    """
+    if isinstance(cube, str):
+        cube = Cube.from_facelet_string(cube)
+    cubie = CubieCube.from_cube(cube)
+    search = _Search(cubie, get_tables(cache_dir), max_length,
+                     time.perf_counter() + timeout)
+    solution = search.run()
+    if solution is None:
+        raise ValueError(
+            "No solution found within {} seconds".format(timeout))
+    if strict and len(solution) > max_length:
+        raise ValueError(
+            "No solution of at most {} moves found within {} seconds (the "
+            "shortest has {})".format(max_length, timeout, len(solution)))
+    return [MOVES[coords.FACE_MOVES[move]] for move in solution]
+
+
+def main():
+    """ Entry point: solves the facelet string given as the first argument """
+    if len(sys.argv) != 2:
+        print("Usage: python solver.py <facelet string>")
+        sys.exit(1)
+    print(moves_to_string(solve(sys.argv[1])))
+
+
+if __name__ == "__main__":
+    main()
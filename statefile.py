@@ -0,0 +1,270 @@
+"""
+Compact binary files of cube states
+
+A state file is a 16 byte header (the magic bytes and the record format) then
+fixed size records, so files of millions of states can be memory mapped as
+NumPy structured arrays and appended to. There are two record formats:
+    facelets: the 54 facelet colours at 4 bits each (27 bytes), which can hold
+        any colouring, including whole cube rotations
+    cubie: each corner's cubie and twist, and each edge's cubie and flip, one
+        byte each (20 bytes), for reachable states in the standard orientation
+        (the cubies are placed relative to the centres, as in cube.CubieCube)
+States are converted to and from (N, 54) arrays of SquareColor values (as held
+by cubebatch.CubeBatch) with vectorised operations, never record by record.
+"""
+import os
+
+import numpy as np
+
+from cube import (CORNER_COUNT, CORNER_FACELETS, CORNER_FACES, EDGE_COUNT,
+                  EDGE_FACELETS, EDGE_FACES, FACELET_COUNT, FACES,
+                  SOLVED_COLORS)
+from cubebatch import CubeBatch
+
+MAGIC = b"CUBESTAT"
+HEADER_SIZE = 16
+FORMATS = {
+    "facelets": np.dtype([("facelets", np.uint8, (FACELET_COUNT // 2, ))]),
+    "cubie": np.dtype([("corners", np.uint8, (CORNER_COUNT, )),
+                       ("edges", np.uint8, (EDGE_COUNT, ))]),
+}
+
+_SOLVED_VALUES = np.array([color.value for color in SOLVED_COLORS],
+                          dtype=np.uint8)
+_CORNER_FACELETS = np.array(CORNER_FACELETS, dtype=np.intp)
+_EDGE_FACELETS = np.array(EDGE_FACELETS, dtype=np.intp)
+_CORNER_FACES = np.array(CORNER_FACES, dtype=np.intp)
+_EDGE_FACES = np.array(EDGE_FACES, dtype=np.intp)
+_N_FACES = len(FACES)
+_CENTRES = np.arange(_N_FACES) * 9 + 4
+# Colour values must fit in the 4 bits of the facelets format
+_MAX_COLORS = 16
+# Base of the cubie lookup indices: a face, or _N_FACES for a colour which is
+# not on any centre
+_BASE = _N_FACES + 1
+# Rows encoded at once by StateWriter, bounding its working memory
+_CHUNK = 1 << 16
+
+
+def _corner_lookup():
+    """
+    Makes the table from the faces of a corner's facelets (read clockwise
+    from any one, as a base _BASE number) to its cubie * 3 + twist, or -1 if
+    no corner has those faces
+    """
+    lookup = np.full(_BASE**3, -1, dtype=np.int16)
+    for corner, faces in enumerate(CORNER_FACES):
+        for twist in range(3):
+            # with twist t, the U/D facelet is in slot t
+            slots = [faces[(n - twist) % 3] for n in range(3)]
+            lookup[(slots[0] * _BASE + slots[1]) * _BASE +
+                   slots[2]] = corner * 3 + twist
+    return lookup
+
+
+def _edge_lookup():
+    """ Like _corner_lookup, for edges (giving cubie * 2 + flip) """
+    lookup = np.full(_BASE**2, -1, dtype=np.int16)
+    for edge, (first, second) in enumerate(EDGE_FACES):
+        lookup[first * _BASE + second] = edge * 2
+        lookup[second * _BASE + first] = edge * 2 + 1
+    return lookup
+
+
+_CORNER_LOOKUP = _corner_lookup()
+_EDGE_LOOKUP = _edge_lookup()
+# The colour in each slot of a corner (or edge) for each cubie * 3 + twist (or
+# cubie * 2 + flip), the inverse of the lookups
+_CORNER_COLORS = np.zeros((3 * CORNER_COUNT, 3), dtype=np.uint8)
+_EDGE_COLORS = np.zeros((2 * EDGE_COUNT, 2), dtype=np.uint8)
+for _code, _corner in enumerate(_CORNER_LOOKUP):
+    if _corner >= 0:
+        _CORNER_COLORS[_corner] = _SOLVED_VALUES[list(
+            np.unravel_index(_code, (_BASE, ) * 3))]
+for _code, _edge in enumerate(_EDGE_LOOKUP):
+    if _edge >= 0:
+        _EDGE_COLORS[_edge] = _SOLVED_VALUES[list(
+            np.unravel_index(_code, (_BASE, ) * 2))]
+
+
+def state_array(states):
+    """
+    Gets an (N, 54) uint8 array from an array or a CubeBatch
+    Raises a ValueError if it has the wrong shape.
+    """
+    if isinstance(states, CubeBatch):
+        states = states.states
+    states = np.asarray(states, dtype=np.uint8)
+    if states.ndim != 2 or states.shape[1] != FACELET_COUNT:
+        raise ValueError("Expected an (N, {}) array of states, got {}".format(
+            FACELET_COUNT, states.shape))
+    return states
+
+
+def face_indices(states):
+    """
+    Gets the (N, 54) array of the face (index into FACES) of each facelet of
+    an array of states (or a CubeBatch), by matching its colour with the
+    centres, or len(FACES) if no centre has its colour
+    Colour values of 16 and above are all treated as one colour.
+    """
+    states = np.minimum(state_array(states), _MAX_COLORS)
+    rows = np.arange(len(states))[:, None]
+    face_of = np.full((len(states), _MAX_COLORS + 1), _N_FACES, dtype=np.int8)
+    face_of[rows, states[:, _CENTRES]] = np.arange(_N_FACES)
+    return face_of[rows, states].astype(np.intp)
+
+
+def cubie_codes(states):
+    """
+    Gets the cubies of an (N, 54) array of states (or a CubeBatch), matching
+    facelets to faces by the centre colours: the (N, 8) array of each corner
+    position's cubie * 3 + twist, and the (N, 12) array of each edge
+    position's cubie * 2 + flip, holding -1 where no cubie has the colours
+    """
+    faces = face_indices(states)
+    corner_faces = faces[:, _CORNER_FACELETS]
+    corners = _CORNER_LOOKUP[(corner_faces[:, :, 0] * _BASE +
+                              corner_faces[:, :, 1]) * _BASE +
+                             corner_faces[:, :, 2]]
+    edge_faces = faces[:, _EDGE_FACELETS]
+    edges = _EDGE_LOOKUP[edge_faces[:, :, 0] * _BASE + edge_faces[:, :, 1]]
+    return corners, edges
+
+
+def encode_states(states, record_format="facelets"):
+    """
+    Encodes an (N, 54) array of states (or a CubeBatch) as an array of
+    records of the given format
+    Raises a ValueError if a state cannot be held in the format.
+    """
+    states = state_array(states)
+    records = np.zeros(len(states), dtype=FORMATS[record_format])
+    if record_format == "facelets":
+        if states.max(initial=0) >= _MAX_COLORS:
+            raise ValueError("Facelet colour values must be below {}".format(
+                _MAX_COLORS))
+        records["facelets"] = states[:, 0::2] | (states[:, 1::2] << 4)
+        return records
+    corners, edges = cubie_codes(states)
+    if (corners < 0).any() or (edges < 0).any():
+        raise ValueError("States have cubies with invalid colours")
+    records["corners"] = corners
+    records["edges"] = edges
+    return records
+
+
+def decode_states(records, record_format="facelets"):
+    """ Decodes an array of records into an (N, 54) array of states """
+    if record_format == "facelets":
+        packed = records["facelets"]
+        states = np.empty((len(records), FACELET_COUNT), dtype=np.uint8)
+        states[:, 0::2] = packed & 0xf
+        states[:, 1::2] = packed >> 4
+        return states
+    states = np.repeat(_SOLVED_VALUES, 9)[None, :].repeat(len(records), 0)
+    for slot in range(3):
+        states[:, _CORNER_FACELETS[:, slot]] = _CORNER_COLORS[
+            records["corners"], slot]
+    for slot in range(2):
+        states[:, _EDGE_FACELETS[:, slot]] = _EDGE_COLORS[records["edges"],
+                                                          slot]
+    return states
+
+
+def _header(record_format):
+    """ Makes the file header for a record format """
+    return MAGIC + record_format.encode("ascii").ljust(
+        HEADER_SIZE - len(MAGIC), b"\0")
+
+
+def read_header(path):
+    """ Gets the record format of a state file """
+    with open(path, "rb") as state_file:
+        header = state_file.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE or not header.startswith(MAGIC):
+        raise ValueError("{} is not a state file".format(path))
+    record_format = header[len(MAGIC):].rstrip(b"\0").decode("ascii")
+    if record_format not in FORMATS:
+        raise ValueError("Unknown record format '{}' in {}".format(
+            record_format, path))
+    return record_format
+
+
+class StateWriter:
+    """
+    Writes states to a state file in chunks, e.g.
+        with StateWriter("states.bin", "cubie") as writer:
+            for batch in batches:
+                writer.write(batch)
+    With append, states are added to the end of an existing file (which must
+    have the same format).
+    """
+
+    def __init__(self, path, record_format="facelets", append=False):
+        if record_format not in FORMATS:
+            raise ValueError("Unknown record format '{}'".format(record_format))
+        self.record_format = record_format
+        if append and os.path.exists(path):
+            if read_header(path) != record_format:
+                raise ValueError("{} holds {} records, not {}".format(
+                    path, read_header(path), record_format))
+            self._file = open(path, "ab")
+        else:
+            self._file = open(path, "wb")
+            self._file.write(_header(record_format))
+        self.count = 0
+
+    def write(self, states):
+        """ Writes an (N, 54) array of states (or a CubeBatch) """
+        states = state_array(states)
+        for start in range(0, len(states), _CHUNK):
+            records = encode_states(states[start:start + _CHUNK],
+                                    self.record_format)
+            self._file.write(records.tobytes())
+            self.count += len(records)
+
+    def close(self):
+        """ Closes the file """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_states(path, states, record_format="facelets"):
+    """ Writes an (N, 54) array of states (or a CubeBatch) to a state file """
+    with StateWriter(path, record_format) as writer:
+        writer.write(states)
+
+
+def load_records(path):
+    """
+    Memory maps the records of a state file (read-only), returning them with
+    their format
+    """
+    record_format = read_header(path)
+    dtype = FORMATS[record_format]
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if not count:
+        return np.zeros(0, dtype=dtype), record_format
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE,
+                     shape=(count, )), record_format
+
+
+def read_states(path, start=0, stop=None):
+    """
+    Reads states start to stop - 1 of a state file, as an (N, 54) array
+    Only those records are read from the file, so large files can be
+    processed a slice at a time.
+    """
+    records, record_format = load_records(path)
+    return decode_states(records[start:stop], record_format)
+
+
+def read_cubes(path, start=0, stop=None):
+    """ Reads states start to stop - 1 of a state file as Cube objects """
+    return CubeBatch(read_states(path, start, stop)).to_cubes()
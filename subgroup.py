@@ -0,0 +1,282 @@
+"""
+Breadth-first enumeration of the subgroups generated by sets of face turns
+
+The states of a subgroup such as <R, U> or <U, D, L2, R2> are numbered by a
+coordinate covering just the pieces the generators move: for corners and for
+edges, the permutation within each orbit of positions the pieces can travel
+around, and the orientations if any generator changes them. Every state of the
+subgroup has a distinct coordinate, so the search keeps the status of every
+state (unseen, in the current frontier, in the next one, or done) in two bit
+arrays indexed by coordinate, and expands the frontier by scanning them a range
+of coordinates at a time. Memory is two bits per coordinate whatever the size
+of the frontier, e.g.
+    python subgroup.py "R U"
+"""
+import argparse
+import math
+
+import numpy as np
+
+from cube import (CORNER_COUNT, CUBIE_MOVES, EDGE_COUNT, FACE_TURNS, CubeMove,
+                  move_index, parse_moves)
+
+# Coordinates scanned (so frontier states expanded) at once
+BFS_CHUNK = 1 << 20
+# Largest state status arrays searched by default, in bits (4 GiB; there are
+# two bits per coordinate, so <R, U> uses 220 MB)
+MAX_BITS = 1 << 35
+
+
+def rank_permutations(perms):
+    """ Ranks the rows of an (N, k) array of permutations of 0..k-1 """
+    k = perms.shape[1]
+    ranks = np.zeros(len(perms), dtype=np.int64)
+    for i in range(k):
+        smaller_later = (perms[:, i + 1:] < perms[:, i:i + 1]).sum(axis=1)
+        ranks = ranks * (k - i) + smaller_later
+    return ranks
+
+
+def unrank_permutations(ranks, k):
+    """ Gets the (N, k) array of permutations of 0..k-1 with the given ranks """
+    ranks = np.asarray(ranks, dtype=np.int64)
+    digits = np.zeros((len(ranks), k), dtype=np.int64)
+    for i in range(k - 1, -1, -1):
+        ranks, digits[:, i] = np.divmod(ranks, k - i)
+    perms = np.zeros_like(digits)
+    unused = np.ones((len(ranks), k), dtype=bool)
+    rows = np.arange(len(ranks))
+    for i in range(k):
+        # the item is the (digit + 1)th one still unused
+        counts = np.cumsum(unused, axis=1)
+        perms[:, i] = np.argmax(counts == digits[:, i:i + 1] + 1, axis=1)
+        unused[rows, perms[:, i]] = False
+    return perms
+
+
+def _orbits(permutations, count):
+    """
+    Groups the positions moved by any of the permutations into orbits (the
+    sets of positions a piece can travel between)
+    """
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    moved = set()
+    for permutation in permutations:
+        for i, source in enumerate(permutation):
+            if source != i:
+                moved.update((i, source))
+                parent[find(i)] = find(source)
+    orbits = {}
+    for i in sorted(moved):
+        orbits.setdefault(find(i), []).append(i)
+    return list(orbits.values())
+
+
+class PieceCoordinate:
+    """
+    Coordinate of the corners or the edges within a subgroup
+    moves is a list of (permutation, orientation changes) pairs, as in
+    cube.CubieCube (cp and co, or ep and eo), and modulus is 3 for corners or 2
+    for edges.
+    """
+
+    def __init__(self, moves, count, modulus):
+        self.orbits = _orbits([permutation for permutation, _ in moves], count)
+        self.positions = [i for orbit in self.orbits for i in orbit]
+        twisted = any(any(changes) for _, changes in moves)
+        self.modulus = modulus if twisted else 1
+        # the last orientation always makes the total 0, so is not stored
+        self.orientations = (self.modulus**(len(self.positions) - 1)
+                             if twisted else 1)
+        self.permutations = math.prod(
+            math.factorial(len(orbit)) for orbit in self.orbits)
+        self.size = self.permutations * self.orientations
+        local = {position: i for i, position in enumerate(self.positions)}
+        # for each move, the local index each position takes its piece from,
+        # and the orientation change
+        self._moves = [
+            (np.array([local[permutation[i]] for i in self.positions]),
+             np.array([changes[i] for i in self.positions]))
+            for permutation, changes in moves
+        ]
+
+    def decode(self, coords):
+        """
+        Gets the (N, pieces) arrays of the piece (local index) in each
+        position, and its orientation, for an array of coordinates
+        """
+        perm_coords, ori_coords = np.divmod(
+            np.asarray(coords, dtype=np.int64), self.orientations)
+        pieces = np.zeros((len(perm_coords), len(self.positions)),
+                          dtype=np.int64)
+        start = len(self.positions)
+        for orbit in reversed(self.orbits):
+            start -= len(orbit)
+            perm_coords, ranks = np.divmod(perm_coords,
+                                           math.factorial(len(orbit)))
+            pieces[:, start:start + len(orbit)] = start + unrank_permutations(
+                ranks, len(orbit))
+        orientations = np.zeros_like(pieces)
+        if self.modulus > 1:
+            for i in range(len(self.positions) - 2, -1, -1):
+                ori_coords, orientations[:, i] = np.divmod(
+                    ori_coords, self.modulus)
+            orientations[:, -1] = -orientations[:, :-1].sum(
+                axis=1) % self.modulus
+        return pieces, orientations
+
+    def encode(self, pieces, orientations):
+        """ Gets the coordinates of arrays of pieces and orientations """
+        perm_coords = np.zeros(len(pieces), dtype=np.int64)
+        start = 0
+        for orbit in self.orbits:
+            ranks = rank_permutations(pieces[:, start:start + len(orbit)] -
+                                      start)
+            perm_coords = perm_coords * math.factorial(len(orbit)) + ranks
+            start += len(orbit)
+        ori_coords = np.zeros(len(pieces), dtype=np.int64)
+        if self.modulus > 1:
+            for i in range(len(self.positions) - 1):
+                ori_coords = ori_coords * self.modulus + orientations[:, i]
+        return perm_coords * self.orientations + ori_coords
+
+    def move_table(self, chunk=BFS_CHUNK):
+        """ Makes the table of the coordinate after each move, [coord, move] """
+        table = np.zeros((self.size, len(self._moves)), dtype=np.int64)
+        for start in range(0, self.size, chunk):
+            coords = np.arange(start, min(start + chunk, self.size))
+            pieces, orientations = self.decode(coords)
+            for i, (sources, changes) in enumerate(self._moves):
+                table[start:start + len(coords), i] = self.encode(
+                    pieces[:, sources],
+                    (orientations[:, sources] + changes) % self.modulus)
+        return table
+
+
+def generator_moves(generators):
+    """
+    Gets the moves of the subgroup generated by face turns: every distinct
+    power of each generator (R gives R, R2 and R'; R2 gives just R2)
+    """
+    moves = []
+    for generator in generators:
+        if generator.turn not in FACE_TURNS:
+            raise ValueError("Generators must be face turns, not {}".format(
+                generator))
+        for power in range(1, 4):
+            move = CubeMove(generator.turn, generator.turns * power % 4)
+            if move.turns and all(
+                (move.turn, move.turns) != (other.turn, other.turns)
+                    for other in moves):
+                moves.append(move)
+    return moves
+
+
+def _set_bits(visited, states):
+    """ Sets the bits of a sorted array of distinct states """
+    if not len(states):
+        return
+    byte_indices = states >> 3
+    bits = (1 << (states & 7)).astype(np.uint8)
+    starts = np.flatnonzero(
+        np.concatenate(([True], byte_indices[1:] != byte_indices[:-1])))
+    visited[byte_indices[starts]] |= np.bitwise_or.reduceat(bits, starts)
+
+
+def _is_set(visited, states):
+    """ Gets which states have their bits set """
+    return (visited[states >> 3] >> (states & 7)) & 1 == 1
+
+
+def _bit_states(bits, start):
+    """
+    Gets the sorted states whose bits are set in part of a bit array, starting
+    at byte start
+    """
+    nonzero = np.flatnonzero(bits)
+    unpacked = np.unpackbits(bits[nonzero, None], axis=1, bitorder="little")
+    rows, columns = np.nonzero(unpacked)
+    return (start + nonzero[rows].astype(np.int64)) * 8 + columns
+
+
+def distance_distribution(generators, max_bits=MAX_BITS, chunk=BFS_CHUNK):
+    """
+    Searches the subgroup generated by a list of face turns (CubeMoves, or a
+    move string such as "R U"), returning the number of states at each
+    distance from solved; the last distance is the diameter
+    Raises a ValueError if the state status arrays would need more than
+    max_bits.
+    """
+    if isinstance(generators, str):
+        generators = parse_moves(generators)
+    moves = generator_moves(generators)
+    cubies = [CUBIE_MOVES[move_index(move)] for move in moves]
+    corners = PieceCoordinate([(cubie.cp, cubie.co) for cubie in cubies],
+                              CORNER_COUNT, 3)
+    edges = PieceCoordinate([(cubie.ep, cubie.eo) for cubie in cubies],
+                            EDGE_COUNT, 2)
+    size = corners.size * edges.size
+    if 2 * size > max_bits:
+        raise ValueError(
+            "The coordinate needs {} bits, more than the limit of {}".format(
+                2 * size, max_bits))
+    corner_table = corners.move_table(chunk)
+    edge_table = edges.move_table(chunk)
+
+    # the status of each state as (high bit, low bit): unseen 00, in the
+    # current frontier 01, in the next frontier 10, done 11
+    high = np.zeros((size + 7) // 8, dtype=np.uint8)
+    low = np.zeros_like(high)
+    low[0] = 1
+    step = max(chunk // 8, 1)
+    distribution = []
+    count = 1
+    while count:
+        distribution.append(count)
+        count = 0
+        for start in range(0, len(high), step):
+            current = low[start:start + step] & ~high[start:start + step]
+            if not current.any():
+                continue
+            corner_coords, edge_coords = np.divmod(
+                _bit_states(current, start), edges.size)
+            for move in range(len(moves)):
+                states = (corner_table[corner_coords, move] * edges.size +
+                          edge_table[edge_coords, move])
+                unseen = ~(_is_set(high, states) | _is_set(low, states))
+                states = np.unique(states[unseen])
+                # mark them as in the next frontier
+                _set_bits(high, states)
+                count += len(states)
+        # the current frontier is done, and the next one becomes current
+        for start in range(0, len(high), step):
+            done = low[start:start + step].copy()
+            low[start:start + step] |= high[start:start + step]
+            high[start:start + step] = done
+    return distribution
+
+
+def main():
+    """ Entry point """
+    parser = argparse.ArgumentParser(
+        description="Count the states of a subgroup at each distance")
+    parser.add_argument("generators",
+                        help="face turns generating the subgroup, e.g. 'R U'")
+    parser.add_argument("--max-bits", type=int, default=MAX_BITS,
+                        help="largest visited bit array to allocate")
+    args = parser.parse_args()
+    distribution = distance_distribution(args.generators, args.max_bits)
+    for depth, count in enumerate(distribution):
+        print("{:3} {:14}".format(depth, count))
+    print("{} states, diameter {}".format(sum(distribution),
+                                          len(distribution) - 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Symmetries of the Rubik's cube
+
+The 48 symmetries (the 24 whole cube rotations, each with and without a left
+to right mirror) are kept as facelet permutations, so applying one is a table
+lookup. Conjugating a state by every symmetry and keeping the smallest gives
+a canonical representative, shared by all states equivalent under symmetry.
+"""
+import numpy as np
+
+from cube import (CubeMove, CubeTurn, FACES, IDENTITY, MOVE_PERMUTATIONS,
+                  SOLVED_COLORS, compose_permutations, move_index,
+                  pack_facelets)
+
+N_ROTATIONS = 24
+N_SYMMETRIES = 48
+
+
+def _mirror_permutation():
+    """
+    Facelet permutation mirroring the cube left to right: R and L swap, and the
+    columns of every face are reversed
+    """
+    swapped = {"right": "left", "left": "right"}
+    permutation = []
+    for name in FACES:
+        source = FACES.index(swapped.get(name, name))
+        for square in range(9):
+            row, col = divmod(square, 3)
+            permutation.append(9 * source + 3 * row + 2 - col)
+    return tuple(permutation)
+
+
+def _rotations():
+    """
+    Finds the 24 whole cube rotations by composing x, y and z rotations
+    Returns the permutations along with the moves making each one.
+    """
+    generators = [
+        CubeMove(turn) for turn in (CubeTurn.x, CubeTurn.y, CubeTurn.z)
+    ]
+    found = {IDENTITY: []}
+    frontier = [IDENTITY]
+    while frontier:
+        next_frontier = []
+        for permutation in frontier:
+            for move in generators:
+                rotated = compose_permutations(
+                    permutation, MOVE_PERMUTATIONS[move_index(move)])
+                if rotated not in found:
+                    found[rotated] = found[permutation] + [move]
+                    next_frontier.append(rotated)
+        frontier = next_frontier
+    return list(found), list(found.values())
+
+
+ROTATION_PERMUTATIONS, ROTATION_MOVES = _rotations()
+MIRROR_PERMUTATION = _mirror_permutation()
+# Symmetry i < 24 is rotation i, and symmetry i + 24 is rotation i mirrored
+SYMMETRY_PERMUTATIONS = tuple(ROTATION_PERMUTATIONS) + tuple(
+    compose_permutations(MIRROR_PERMUTATION, permutation)
+    for permutation in ROTATION_PERMUTATIONS)
+_SYMMETRY_INDICES = {
+    permutation: i
+    for i, permutation in enumerate(SYMMETRY_PERMUTATIONS)
+}
+# SYMMETRY_MULTIPLY[a][b] is the symmetry a followed by b
+SYMMETRY_MULTIPLY = tuple(
+    tuple(_SYMMETRY_INDICES[compose_permutations(first, second)]
+          for second in SYMMETRY_PERMUTATIONS)
+    for first in SYMMETRY_PERMUTATIONS)
+SYMMETRY_INVERSE = tuple(row.index(0) for row in SYMMETRY_MULTIPLY)
+
+_CENTRES = tuple(9 * face + 4 for face in range(len(FACES)))
+_SOLVED_CENTRES = tuple(color.value for color in SOLVED_COLORS)
+
+
+def conjugate(values, symmetry):
+    """
+    Gets the state equivalent to the facelet colour values (as in
+    Cube.color_values) under a symmetry, in the standard colours: the whole
+    cube is moved by the symmetry, then recoloured so each centre is its face's
+    usual colour
+    """
+    moved = bytes(values[i] for i in SYMMETRY_PERMUTATIONS[symmetry])
+    recolor = bytearray(range(256))
+    for centre, value in zip(_CENTRES, _SOLVED_CENTRES):
+        recolor[moved[centre]] = value
+    return moved.translate(recolor)
+
+
+def canonical(cube, symmetries=N_SYMMETRIES):
+    """
+    Gets the canonical form of a cube's state (the conjugate with the
+    lexicographically smallest colour values), as a packed state key (see
+    cube.pack_facelets), along with the symmetry taking the cube to it
+    Use symmetries=N_ROTATIONS to only consider rotations (no mirroring).
+    """
+    values = cube.color_values
+    conjugates = [conjugate(values, symmetry) for symmetry in range(symmetries)]
+    best = min(conjugates)
+    return pack_facelets(best), conjugates.index(best)
+
+
+# (48, 54) table of the symmetry permutations, for batches of states
+SYMMETRY_TABLE = np.array(SYMMETRY_PERMUTATIONS, dtype=np.intp)
+
+
+def canonical_batch(states, symmetries=N_SYMMETRIES):
+    """
+    Gets the canonical forms of an (N, 54) array of colour values (as held by
+    cubebatch.CubeBatch), along with the symmetry taking each state to it
+    The canonical form is the lexicographically smallest conjugate.
+    """
+    states = np.asarray(states, dtype=np.uint8)
+    rows = np.arange(len(states))[:, None]
+    best = None
+    best_symmetry = np.zeros(len(states), dtype=np.intp)
+    solved_centres = np.array([color.value for color in SOLVED_COLORS],
+                              dtype=np.uint8)
+    for symmetry in range(symmetries):
+        moved = states[:, SYMMETRY_TABLE[symmetry]]
+        # per state lookup table from colour value to standard colour value
+        recolor = np.zeros((len(states), 8), dtype=np.uint8)
+        recolor[rows, moved[:, _CENTRES]] = solved_centres
+        moved = recolor[rows, moved]
+        if best is None:
+            best = moved
+            continue
+        # compare rows lexicographically, by the first facelet that differs
+        differs = moved != best
+        first = np.argmax(differs, axis=1)
+        smaller = (differs.any(axis=1) &
+                   (moved[rows[:, 0], first] < best[rows[:, 0], first]))
+        best[smaller] = moved[smaller]
+        best_symmetry[smaller] = symmetry
+    return best, best_symmetry
@@ -0,0 +1,41 @@
+""" Tests of the cube model """
+import io
+import itertools
+import unittest
+
+from cube import iter_moves, moves_to_string, parse_moves
+
+
+class IterMovesTest(unittest.TestCase):
+    """ Tests of iter_moves """
+
+    def test_stream_without_whitespace(self):
+        source = io.StringIO("RUR'U'r2" * 10000)
+        moves = iter_moves(source, chunk_size=16)
+        first = list(itertools.islice(moves, 5))
+        self.assertEqual(moves_to_string(first), "R U R' U' Rw2")
+        # moves are yielded as the input is read, not once it is all buffered
+        self.assertLess(source.tell(), 64)
+        self.assertEqual(len(first) + len(list(moves)), 5 * 10000)
+
+    def test_chunk_boundaries(self):
+        text = "RUR'U'Rw2'x\nF2 D'"
+        expected = moves_to_string(parse_moves(text))
+        for chunk_size in range(1, len(text) + 1):
+            moves = iter_moves(io.StringIO(text), chunk_size=chunk_size)
+            self.assertEqual(moves_to_string(moves), expected)
+
+    def test_empty_input(self):
+        self.assertEqual(list(iter_moves("")), [])
+        self.assertEqual(list(iter_moves(io.StringIO(""))), [])
+        self.assertEqual(list(iter_moves("  \n")), [])
+
+    def test_errors_across_chunks(self):
+        errors = []
+        moves = list(iter_moves(io.StringIO("RU Q?R x"), errors, chunk_size=2))
+        self.assertEqual(moves_to_string(moves), "R U x")
+        self.assertEqual(errors, [(3, "Q?R")])
+
+
+if __name__ == "__main__":
+    unittest.main()
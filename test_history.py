@@ -0,0 +1,30 @@
+""" Tests of the move history """
+import unittest
+
+from cube import Cube, parse_moves
+from history import HistoryCube
+
+
+class MakeMovesTest(unittest.TestCase):
+    """ Tests of HistoryCube.make_moves """
+
+    def test_move_string(self):
+        moves = "R U R' U' F2 x D'"
+        cube = HistoryCube()
+        cube.make_moves(moves)
+        expected = Cube()
+        expected.make_moves(moves)
+        self.assertEqual(cube, expected)
+        self.assertEqual([str(move) for move in cube.history],
+                         [str(move) for move in parse_moves(moves)])
+
+    def test_undo_move_string(self):
+        cube = HistoryCube()
+        cube.make_moves("R U R' U'")
+        while cube.can_undo():
+            cube.undo()
+        self.assertEqual(cube, Cube())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+""" Tests of the random state scramble generator """
+import random
+import unittest
+
+import scramble
+from cube import Cube
+
+
+class GenerateScramblesTest(unittest.TestCase):
+    """ Tests of generate_scrambles """
+
+    def test_timeouts_are_retried(self):
+        # with no time at all every state times out at first, so each one has
+        # to be retried with a longer timeout
+        n = 3
+        scrambles = list(
+            scramble.generate_scrambles(n, workers=1, seed=1, timeout=0))
+        self.assertEqual(len(scrambles), n)
+        rng = random.Random(1)
+        for moves in scrambles:
+            cube = Cube()
+            cube.make_moves(moves)
+            self.assertEqual(cube, scramble.random_state(rng))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Vectorised checks that batches of states are reachable
+
+validate_states checks an (N, 54) array of facelet colours (or a CubeBatch),
+such as states typed in or read from images, in whole-array operations and
+gives a code for each state: VALID, or the first of these problems it has
+    INVALID_CENTRES: two centres have the same colour
+    INVALID_COLORS: a colour is on no centre, or not on 9 facelets
+    INVALID_CORNER: a corner's colours are not those of any corner
+    INVALID_EDGE: an edge's colours are not those of any edge
+    DUPLICATE_CUBIE: two corners (or two edges) are the same cubie
+    TWISTED_CORNER: the corner twists do not add up to a multiple of 3
+    FLIPPED_EDGE: an odd number of edges are flipped
+    PARITY: the corner and edge permutations have different parities
+These are the checks of cube.CubieCube.from_facelets and verify, e.g.
+    codes = validate_states(states)
+    bad = np.flatnonzero(codes != VALID)
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from cube import CORNER_COUNT, EDGE_COUNT, FACES
+from statefile import cubie_codes, face_indices, read_states, state_array
+
+VALID = 0
+INVALID_CENTRES = 1
+INVALID_COLORS = 2
+INVALID_CORNER = 3
+INVALID_EDGE = 4
+DUPLICATE_CUBIE = 5
+TWISTED_CORNER = 6
+FLIPPED_EDGE = 7
+PARITY = 8
+
+ERROR_MESSAGES = {
+    VALID: "Valid",
+    INVALID_CENTRES: "Centre colours are not all different",
+    INVALID_COLORS: "Colours are not on 9 facelets each",
+    INVALID_CORNER: "A corner has invalid colours",
+    INVALID_EDGE: "An edge has invalid colours",
+    DUPLICATE_CUBIE: "A cubie appears twice",
+    TWISTED_CORNER: "A corner is twisted",
+    FLIPPED_EDGE: "An edge is flipped",
+    PARITY: "Two cubies are swapped",
+}
+
+
+def permutation_parities(perms):
+    """ Gets the parity (0 even, 1 odd) of each row of an array of perms """
+    inversions = np.zeros(len(perms), dtype=np.int64)
+    for i in range(perms.shape[1] - 1):
+        inversions += (perms[:, i + 1:] < perms[:, i:i + 1]).sum(axis=1)
+    return inversions % 2
+
+
+def validate_states(states):
+    """
+    Checks an (N, 54) array of states (or a CubeBatch), returning the uint8
+    array of each state's code (see the module docstring)
+    """
+    states = state_array(states)
+    codes = np.zeros(len(states), dtype=np.uint8)
+
+    def fail(failed, code):
+        # only the first problem found is reported
+        codes[failed & (codes == VALID)] = code
+
+    centres = np.sort(states[:, 4::9], axis=1)
+    fail((centres[:, 1:] == centres[:, :-1]).any(axis=1), INVALID_CENTRES)
+    faces = face_indices(states)
+    counts = np.stack([(faces == face).sum(axis=1)
+                       for face in range(len(FACES))], axis=1)
+    fail((counts != 9).any(axis=1), INVALID_COLORS)
+
+    corners, edges = cubie_codes(states)
+    fail((corners < 0).any(axis=1), INVALID_CORNER)
+    fail((edges < 0).any(axis=1), INVALID_EDGE)
+    # the rest of the checks only matter for states with valid cubies
+    corners = np.maximum(corners, 0)
+    edges = np.maximum(edges, 0)
+    cp, co = np.divmod(corners, 3)
+    ep, eo = np.divmod(edges, 2)
+    fail((np.sort(cp, axis=1) != np.arange(CORNER_COUNT)).any(axis=1) |
+         (np.sort(ep, axis=1) != np.arange(EDGE_COUNT)).any(axis=1),
+         DUPLICATE_CUBIE)
+    fail(co.sum(axis=1) % 3 != 0, TWISTED_CORNER)
+    fail(eo.sum(axis=1) % 2 != 0, FLIPPED_EDGE)
+    fail(permutation_parities(cp) != permutation_parities(ep), PARITY)
+    return codes
+
+
+def main():
+    """ Entry point """
+    parser = argparse.ArgumentParser(
+        description="Check that the states in a state file are reachable")
+    parser.add_argument("path", help="state file (see statefile.py)")
+    args = parser.parse_args()
+    codes = validate_states(read_states(args.path))
+    for index in np.flatnonzero(codes != VALID):
+        print("{}: {}".format(index, ERROR_MESSAGES[codes[index]]))
+    print("{} of {} states are valid".format(
+        np.count_nonzero(codes == VALID), len(codes)), file=sys.stderr)
+    sys.exit(1 if (codes != VALID).any() else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Verifies logs of scrambles and their solutions
+
+Each line of the input is either a JSON object with "scramble" and "solution"
+keys, or plain text with the scramble and solution separated by a "|" (or a
+tab). Every pair is applied to a fresh cube and checked, and a verdict line is
+written for each with the final state. Lines are read, checked and written one
+at a time (or a bounded number at a time over a pool of worker processes), so
+logs of any size are verified in constant memory.
+"""
+import argparse
+import collections
+import json
+import sys
+
+from cube import Cube, iter_moves
+from parallel import ordered_imap
+
+
+def parse_record(line):
+    """
+    Gets the (scramble, solution) strings from a line of a log
+    Raises a ValueError if the line is not a valid record.
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+            scramble, solution = record["scramble"], record["solution"]
+        except (ValueError, KeyError, TypeError) as err:
+            raise ValueError("Invalid JSON record: {}".format(err)) from err
+        if not isinstance(scramble, str) or not isinstance(solution, str):
+            raise ValueError(
+                "Invalid JSON record: scramble and solution must be strings")
+        return scramble, solution
+    separator = "|" if "|" in line else "\t"
+    if separator not in line:
+        raise ValueError("Expected a scramble and solution separated by '|'")
+    scramble, solution = line.split(separator, 1)
+    return scramble, solution
+
+
+def check_line(line):
+    """
+    Checks one line of a log, returning its verdict as a dict with "ok" (True
+    when the solution solves the scramble), the final "state" as a facelet
+    string and, for lines that could not be checked, an "error" message
+    """
+    try:
+        scramble, solution = parse_record(line)
+        cube = Cube()
+        for move in iter_moves(scramble):
+            cube.make_move(move)
+        for move in iter_moves(solution):
+            cube.make_move(move)
+    except ValueError as err:
+        return {"ok": False, "state": None, "error": str(err)}
+    return {"ok": cube.is_solved(), "state": cube.to_facelet_string()}
+
+
+def _check_numbered_line(numbered_line):
+    """ Checks a (line number, line) pair, adding the number to its verdict """
+    number, line = numbered_line
+    return dict(check_line(line), line=number)
+
+
+def check_lines(lines, workers=1, max_pending=None):
+    """
+    Checks an iterable of log lines, yielding their verdicts (see check_line)
+    in the same order, each with its 1-based "line" number
+    Blank lines are skipped. With more than one worker the lines are checked
+    over a process pool, with at most max_pending (default 64 per worker) read
+    ahead at once.
+    """
+    numbered = ((number, line) for number, line in enumerate(lines, 1)
+                if line.strip())
+    if workers <= 1:
+        return map(_check_numbered_line, numbered)
+    return ordered_imap(_check_numbered_line, numbered, workers,
+                        max_pending or 64 * workers)
+
+
+def format_verdict(verdict):
+    """ Formats a verdict as a line of text """
+    if "error" in verdict:
+        return "{} ERROR {}".format(verdict["line"], verdict["error"])
+    return "{} {} {}".format(verdict["line"], "OK" if verdict["ok"] else "FAIL",
+                             verdict["state"])
+
+
+def main():
+    """ Entry point """
+    parser = argparse.ArgumentParser(
+        description="Verify a log of scrambles and solutions")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="log to verify, JSONL or text (default stdin)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="file to write verdicts to (default stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes (default 1)")
+    parser.add_argument("--json", action="store_true",
+                        help="write the verdicts as JSON lines")
+    args = parser.parse_args()
+
+    in_file = sys.stdin if args.input == "-" else open(args.input)
+    out_file = sys.stdout if args.output == "-" else open(args.output, "w")
+    counts = collections.Counter()
+    try:
+        for verdict in check_lines(in_file, args.workers):
+            counts["error" if "error" in verdict else verdict["ok"]] += 1
+            out_file.write((json.dumps(verdict) if args.json else
+                            format_verdict(verdict)) + "\n")
+    finally:
+        if in_file is not sys.stdin:
+            in_file.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+    print("{} solved, {} not solved, {} invalid".format(
+        counts[True], counts[False], counts["error"]), file=sys.stderr)
+    if counts[False] or counts["error"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Zobrist hashing of cube states
+
+The hash XORs together a random 64 bit number for each facelet's colour, so a
+move changes it by just the numbers of the facelets it moves, and ZobristCube
+keeps it up to date in time proportional to those facelets rather than the
+whole state.
+"""
+import random
+import sys
+
+from cube import FACELET_COUNT, IDENTITY, MOVE_GETTERS, Cube, SquareColor
+
+# Random 64 bit number for each (facelet, colour value), XORed together to make
+# a Zobrist hash of the state
+_ZOBRIST_RANDOM = random.Random(4810)
+ZOBRIST_TABLE = tuple(
+    tuple(_ZOBRIST_RANDOM.getrandbits(64) for _ in range(len(SquareColor) + 1))
+    for _ in range(FACELET_COUNT))
+# The facelets moved by each permutation in MOVE_GETTERS
+_MOVED_FACELETS = {
+    key: tuple(i for i, source in enumerate(getter(IDENTITY)) if source != i)
+    for key, getter in MOVE_GETTERS.items()
+}
+
+
+def zobrist_hash(values):
+    """
+    Computes the Zobrist hash of a state from scratch, from its facelet colour
+    values (as in Cube.color_values)
+    """
+    value = 0
+    for i, color in enumerate(values):
+        value ^= ZOBRIST_TABLE[i][color]
+    return value
+
+
+class ZobristCube(Cube):
+    """
+    Cube which keeps a Zobrist hash of its state (zobrist), updated with each
+    move from just the facelets that moved
+    """
+
+    __slots__ = ("zobrist", )
+
+    def __init__(self):
+        super().__init__()
+        self.zobrist = zobrist_hash(self.color_values)
+
+    def copy(self):
+        """ Creates a copy of the cube (and its hash) """
+        cube = super().copy()
+        cube.zobrist = self.zobrist
+        return cube
+
+    def memory_size(self):
+        """ Gets the bytes used by this cube's own objects (and its hash) """
+        return super().memory_size() + sys.getsizeof(self.zobrist)
+
+    def rehash(self):
+        """ Recomputes the hash, after the facelets are set directly """
+        self.zobrist = zobrist_hash(self.color_values)
+
+    def make_move(self, move):
+        """ Given a move, make it (and update the hash) """
+        self._move(move.turn, move.turns % 4)
+
+    def _turn(self, turn):
+        """ Makes a single clockwise quarter turn (and updates the hash) """
+        self._move(turn, 1)
+
+    def _move(self, turn, turns):
+        """ Makes a move, updating the hash for each facelet that moves """
+        old = self.color_values
+        new = MOVE_GETTERS[turn, turns](old)
+        value = self.zobrist
+        table = ZOBRIST_TABLE
+        for i in _MOVED_FACELETS[turn, turns]:
+            row = table[i]
+            value ^= row[old[i]] ^ row[new[i]]
+        # color_values cleared the frame, so the tuple can be kept as it is
+        self._facelets = new
+        self.zobrist = value
+
+    def apply_permutation(self, permutation):
+        """ Moves the facelets as given by a permutation (and rehashes) """
+        super().apply_permutation(permutation)
+        self.rehash()
+
+    @classmethod
+    def from_state_key(cls, key):
+        """ Creates a cube from a state key """
+        cube = super().from_state_key(key)
+        cube.rehash()
+        return cube